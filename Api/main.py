@@ -1,37 +1,67 @@
 """
 FastAPI server for Credit Scoring predictions
 """
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Header, Request
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, ValidationError
+from starlette.concurrency import run_in_threadpool
 import sys
 from pathlib import Path
 import logging
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, nullcontext
 import pandas as pd
 
 # Setup path to import from src
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
+from src.utils.audit_utils import AuditLogger, AuditLogFullError
+from src.utils.profiling_utils import profile_run, profile_header_allowed
+from src.utils.data_utils import (
+    decode_columns, decode_row, validate_columns, columns_to_frame, ColumnValidationError
+)
+from src.models.predict import CreditScorePredictor
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Initialize model globally
 predictor = None
+drift_monitor = None
+audit_logger = None
+score_table = None
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Load model on startup"""
-    global predictor
+    global predictor, drift_monitor, audit_logger, score_table
     try:
-        from src.models.predict import CreditScorePredictor
         predictor = CreditScorePredictor()
         logger.info("Model loaded successfully")
     except Exception as e:
         logger.error(f"Failed to load model: {e}")
         logger.info("Model will be loaded on first request")
+    try:
+        from src.utils.monitoring_utils import DriftMonitor
+        drift_monitor = DriftMonitor.load(project_root / "artifacts" / "monitoring_reference.json")
+        logger.info("Drift monitor loaded successfully")
+    except Exception as e:
+        logger.warning(f"Drift monitoring disabled: {e}")
+    try:
+        from src.models.score_table import ScoreTable
+        score_table = ScoreTable()
+        if not _score_table_current():
+            raise RuntimeError("score table was not built for the loaded model; "
+                               "rerun src/pipelines/precompute_scores.py")
+        logger.info(f"Score table loaded with {len(score_table)} customers")
+    except Exception as e:
+        score_table = None
+        logger.warning(f"Score-by-ID disabled: {e}")
+
+    audit_logger = AuditLogger(project_root / "artifacts" / "audit").start()
     yield
+    audit_logger.close()
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -93,11 +123,25 @@ def read_root():
         "endpoints": {
             "predict": "/predict",
             "batch_predict": "/batch_predict",
-            "health": "/health"
+            "fast_predict": "/fast/predict",
+            "fast_batch_predict": "/fast/batch_predict",
+            "score": "/score/{ID}",
+            "health": "/health",
+            "drift": "/monitoring/drift"
         }
     }
 
 
+def _score_table_current():
+    """True when the score table was computed by the loaded model and processor"""
+    return predictor is not None and score_table.model_fingerprint == predictor.fingerprint
+
+
+def _profiling(name, x_profile):
+    """profile_run when the X-Profile header is set and CREDIT_SCORING_PROFILE_HEADER allows it"""
+    return profile_run(name) if x_profile and profile_header_allowed() else nullcontext()
+
+
 @app.get("/health")
 def health_check():
     """Health check endpoint"""
@@ -107,7 +151,8 @@ def health_check():
 
 
 @app.post("/predict", response_model=PredictionResponse)
-def predict_single(customer: CustomerData):
+def predict_single(customer: CustomerData, background_tasks: BackgroundTasks,
+                   x_profile: str | None = Header(default=None)):
     """
     Predict default probability for single customer
     
@@ -128,21 +173,31 @@ def predict_single(customer: CustomerData):
         # Convert to DataFrame
         df = pd.DataFrame([customer.dict()])
         
-        # Make prediction
-        result = predictor.predict(df)
+        # Make prediction (profiled when the X-Profile header is set and allowed)
+        with _profiling("api_predict", x_profile):
+            result = predictor.predict(df)
         
         # Add ID to response
         result['ID'] = customer.ID
+
+        if drift_monitor is not None:
+            background_tasks.add_task(drift_monitor.update, df)
+
+        audit_logger.log({'endpoint': '/predict', 'request': customer.dict(), 'response': result})
         
         return PredictionResponse(**result)
         
+    except AuditLogFullError as e:
+        logger.error(f"Audit log unavailable: {e}")
+        raise HTTPException(status_code=503, detail="Audit log unavailable")
     except Exception as e:
         logger.error(f"Prediction error: {e}")
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @app.post("/batch_predict")
-def predict_batch(request: BatchPredictionRequest):
+def predict_batch(request: BatchPredictionRequest, background_tasks: BackgroundTasks,
+                  x_profile: str | None = Header(default=None)):
     """
     Predict default probability for batch of customers
     
@@ -161,17 +216,142 @@ def predict_batch(request: BatchPredictionRequest):
         # Convert to DataFrame
         df = pd.DataFrame(request.data)
         
-        # Make predictions
-        results = predictor.predict_batch(df)
+        # Make predictions (profiled when the X-Profile header is set and allowed)
+        with _profiling("api_batch_predict", x_profile):
+            results = predictor.predict_batch(df)
+
+        if drift_monitor is not None:
+            background_tasks.add_task(drift_monitor.update, df)
         
         # Convert to dict list
-        return results.to_dict(orient='records')
+        records = results.to_dict(orient='records')
+        audit_logger.log({'endpoint': '/batch_predict', 'request': request.data, 'response': records})
+        return records
         
+    except AuditLogFullError as e:
+        logger.error(f"Audit log unavailable: {e}")
+        raise HTTPException(status_code=503, detail="Audit log unavailable")
     except Exception as e:
         logger.error(f"Batch prediction error: {e}")
         raise HTTPException(status_code=400, detail=str(e))
 
 
+def _score_columns(columns, endpoint, x_profile, background_tasks):
+    """Shared body of the column-oriented endpoints; runs in the threadpool"""
+    try:
+        validate_columns(columns)
+    except ColumnValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors)
+
+    df = columns_to_frame(columns)
+    try:
+        with _profiling(f"api_{endpoint.strip('/').replace('/', '_')}", x_profile):
+            result = {'ID': columns['ID'], **predictor.predict_arrays(df)}
+    except Exception as e:
+        logger.error(f"Prediction error: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if drift_monitor is not None:
+        background_tasks.add_task(drift_monitor.update, df)
+    try:
+        audit_logger.log({'endpoint': endpoint, 'request': columns, 'response': result})
+    except AuditLogFullError as e:
+        logger.error(f"Audit log unavailable: {e}")
+        raise HTTPException(status_code=503, detail="Audit log unavailable")
+    return result
+
+
+@app.post("/fast/predict", response_class=ORJSONResponse)
+async def fast_predict_single(request: Request, background_tasks: BackgroundTasks,
+                              x_profile: str | None = Header(default=None)):
+    """
+    Fast JSON mode of /predict: one flat object using the training column names
+
+    Example:
+    {"ID": 1, "LIMIT_BAL": 20000, "SEX": 2, "EDUCATION": 2, "MARRIAGE": 1, "AGE": 24,
+     "PAY_0": 2, "PAY_2": 2, ..., "BILL_AMT1": 3913, ..., "PAY_AMT1": 0, ...}
+    """
+    if predictor is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    try:
+        columns = decode_row(await request.body())
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_input=False))
+
+    result = await run_in_threadpool(_score_columns, columns, "/fast/predict", x_profile, background_tasks)
+    return ORJSONResponse({key: values[0] for key, values in result.items()})
+
+
+@app.post("/fast/batch_predict", response_class=ORJSONResponse)
+async def fast_predict_batch(request: Request, background_tasks: BackgroundTasks,
+                             x_profile: str | None = Header(default=None)):
+    """
+    Fast JSON mode of /batch_predict: columns in, columns out
+
+    Example:
+    {"ID": [1, 2], "LIMIT_BAL": [20000, 120000], "AGE": [24, 26], ...}
+    """
+    if predictor is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    try:
+        columns = decode_columns(await request.body())
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_input=False))
+
+    result = await run_in_threadpool(_score_columns, columns, "/fast/batch_predict", x_profile, background_tasks)
+    return ORJSONResponse(result)
+
+
+@app.get("/score/{customer_id}")
+def score_by_id(customer_id: int, rescore: bool = False):
+    """
+    Look up the precomputed score of an existing customer
+
+    With rescore=true the stored feature row is run through the loaded model
+    instead of returning the precomputed probability.
+    """
+    if score_table is None:
+        raise HTTPException(status_code=503, detail="Score table not loaded")
+    # Stored scores and scaled rows belong to one model/processor pair; after a retrain they are
+    # stale until precompute_scores.py is rerun
+    if not _score_table_current():
+        raise HTTPException(status_code=503, detail="Score table is out of date for the loaded model")
+
+    idx = score_table.find(customer_id)
+    if idx is None:
+        raise HTTPException(status_code=404, detail=f"Customer {customer_id} not found")
+
+    if rescore:
+        # Stored rows are already scaled, so they go straight to the model
+        prob = float(predictor.model.predict(score_table.features(idx))[0])
+    else:
+        prob = score_table.score(idx)
+
+    pred = int(prob > 0.5)
+    result = {
+        'ID': customer_id,
+        'default_probability': round(prob, 4),
+        'default_prediction': pred,
+        'default_label': 'Default' if pred == 1 else 'No Default',
+        'risk_level': CreditScorePredictor._get_risk_level(prob),
+    }
+    try:
+        audit_logger.log({'endpoint': '/score', 'request': {'ID': customer_id, 'rescore': rescore},
+                          'response': result})
+    except AuditLogFullError as e:
+        logger.error(f"Audit log unavailable: {e}")
+        raise HTTPException(status_code=503, detail="Audit log unavailable")
+    return result
+
+
+@app.get("/monitoring/drift")
+def drift_report():
+    """PSI/KS drift of served features against the training reference"""
+    if drift_monitor is None:
+        raise HTTPException(status_code=503, detail="Drift monitor not loaded")
+    return drift_monitor.report()
+
+
 @app.get("/model_info")
 def model_info():
     """Get model information"""
@@ -179,10 +359,8 @@ def model_info():
         "name": "credit_scoring_ensemble",
         "type": "StackedEnsemble",
         "base_models": [
-            "ExtraTreesClassifier",
-            "KNeighborsClassifier",
-            "GradientBoostingClassifier"
-        ],
+            model.__class__.__name__ for model in predictor.model.fitted_base_models
+        ] if predictor is not None else [],
         "meta_model": "LogisticRegression",
         "input_features": 25,
         "classes": ["No Default", "Default"],
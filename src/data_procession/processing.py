@@ -6,19 +6,130 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from data_procession.data_loader import DataLoader
+from utils.profiling_utils import profiled
+import hashlib
+import json
+import os
+import tempfile
 import numpy as np
+from joblib import Parallel, delayed
 from sklearn.preprocessing import StandardScaler, PowerTransformer, QuantileTransformer
 from sklearn.model_selection import train_test_split
-from scipy import stats
+from scipy import stats, optimize
 
-file = str(Path(__file__).parent.parent.parent / "data" / "UCI_Credit_Card.csv")
+LAMBDA_CACHE_PATH = Path(__file__).parent.parent.parent / "artifacts" / "scaler_cache" / "yeo_johnson_lambdas.json"
+LAMBDA_CACHE_SIZE = 1024  # most recently used entries kept on disk
 
-loader = DataLoader(file)
-loader.load_data()
-df = loader.clean_data()
-#print(loader.data_informer())
 
-columns = [col for col in df.columns if df[col].nunique() > 10 and col != 'ID']
+def _column_fingerprint(x):
+    """Content hash of a column, used as the lambda cache key"""
+    return hashlib.sha256(np.ascontiguousarray(x, dtype=np.float64).tobytes()).hexdigest()
+
+
+class FastPowerTransformer(PowerTransformer):
+    """
+    Yeo-Johnson PowerTransformer with faster lambda fitting.
+
+    Each column's lambda is first estimated on a quantile-stratified subsample (evenly
+    spaced order statistics, so the shape of the distribution is kept) and then refined
+    on the full column by a bounded search in a narrow window around that estimate, which
+    needs about half the full-data likelihood evaluations of an unbracketed brent search. Columns are fitted
+    in parallel threads, and lambdas are cached on disk by column fingerprint so unchanged
+    columns skip fitting entirely. Cache keys include subsample and refine_window, and the
+    cache keeps the cache_size most recently used lambdas. Transform behaviour is identical
+    to PowerTransformer.
+    """
+    def __init__(self, method='yeo-johnson', *, standardize=True, copy=True,
+                 subsample=5000, refine_window=0.05, n_jobs=-1, cache_path=LAMBDA_CACHE_PATH,
+                 cache_size=LAMBDA_CACHE_SIZE):
+        super().__init__(method=method, standardize=standardize, copy=copy)
+        self.subsample = subsample
+        self.refine_window = refine_window
+        self.n_jobs = n_jobs
+        self.cache_path = cache_path
+        self.cache_size = cache_size
+
+    def _cache_key(self, x):
+        # Lambdas fitted with different subsample/refine settings can differ slightly
+        return f"{_column_fingerprint(x)}:{self.subsample}:{self.refine_window}"
+
+    def _neg_log_likelihood(self, lmbda, x):
+        # Same objective as PowerTransformer._yeo_johnson_optimize
+        x_trans_var = self._yeo_johnson_transform(x, lmbda).var()
+        if x_trans_var < np.finfo(np.float64).tiny:
+            return np.inf
+        loglike = -x.shape[0] / 2 * np.log(x_trans_var)
+        loglike += (lmbda - 1) * (np.sign(x) * np.log1p(np.abs(x))).sum()
+        return -loglike
+
+    def _estimate_lambda(self, x):
+        x = x[~np.isnan(x)]
+        sample = x
+        if self.subsample and x.shape[0] > self.subsample:
+            sample = np.sort(x)[np.linspace(0, x.shape[0] - 1, self.subsample).astype(int)]
+        lmbda = optimize.brent(self._neg_log_likelihood, args=(sample,), brack=(-2, 2))
+        if sample is x:
+            return lmbda
+
+        bounds = (lmbda - self.refine_window, lmbda + self.refine_window)
+        result = optimize.minimize_scalar(self._neg_log_likelihood, args=(x,), bounds=bounds,
+                                          method='bounded', options={'xatol': 1e-5})
+        if np.isclose(result.x, bounds, atol=1e-4).any():
+            # Optimum sits on the window edge: the subsample estimate was off, do a full search
+            return optimize.brent(self._neg_log_likelihood, args=(x,), brack=(-2, 2))
+        return result.x
+
+    def _load_cache(self):
+        if self.cache_path and Path(self.cache_path).exists():
+            with open(self.cache_path) as f:
+                return json.load(f)
+        return {}
+
+    def _save_cache(self, cache):
+        path = Path(self.cache_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Unique temp file in the same directory, so concurrent fits never share one and
+        # os.replace stays an atomic rename
+        with tempfile.NamedTemporaryFile('w', dir=path.parent, prefix=path.name + '.',
+                                         suffix='.tmp', delete=False) as f:
+            json.dump(cache, f)
+        try:
+            os.replace(f.name, path)
+        except OSError:
+            os.unlink(f.name)
+            raise
+
+    def _fit(self, X, y=None, force_transform=False):
+        if self.method != 'yeo-johnson':
+            return super()._fit(X, y, force_transform)
+
+        X_checked = self._check_input(X, in_fit=True, check_positive=True)
+        cache = self._load_cache()
+        keys = [self._cache_key(col) for col in X_checked.T]
+        missing = [i for i, key in enumerate(keys) if key not in cache]
+        if missing:
+            lambdas = Parallel(n_jobs=self.n_jobs, prefer='threads')(
+                delayed(self._estimate_lambda)(X_checked[:, i]) for i in missing
+            )
+            cache.update({keys[i]: float(lmbda) for i, lmbda in zip(missing, lambdas)})
+        fitted = {key: cache[key] for key in keys}
+        if self.cache_path and (missing or list(cache)[-len(fitted):] != list(fitted)):
+            # Dicts keep insertion order: move this fit's keys to the end and drop the oldest
+            for key in fitted:
+                del cache[key]
+            cache.update(fitted)
+            self._save_cache(dict(list(cache.items())[-self.cache_size:]))
+
+        # PowerTransformer._fit asks _yeo_johnson_optimize for each column in turn
+        self._fitted_lambdas = fitted
+        try:
+            return super()._fit(X, y, force_transform)
+        finally:
+            del self._fitted_lambdas
+
+    def _yeo_johnson_optimize(self, x):
+        return self._fitted_lambdas[self._cache_key(x)]
+
 
 class DataProcessor:
     def __init__(self, columns, scaler_type='power'):
@@ -27,14 +138,14 @@ class DataProcessor:
         
         Args:
             columns: Columns to scale
-            scaler_type: 'power' (PowerTransformer), 'quantile' (QuantileTransformer), 
+            scaler_type: 'power' (FastPowerTransformer), 'quantile' (QuantileTransformer), 
                         'standard' (StandardScaler), or 'outlier_removal' (remove outliers first)
         """
         self.columns = columns
         self.scaler_type = scaler_type
         
         if scaler_type == 'power':
-            self.scaler = PowerTransformer(method='yeo-johnson')
+            self.scaler = FastPowerTransformer(method='yeo-johnson')
         elif scaler_type == 'quantile':
             self.scaler = QuantileTransformer(output_distribution='normal', random_state=42)
         elif scaler_type == 'standard':
@@ -42,15 +153,23 @@ class DataProcessor:
         else:
             self.scaler = StandardScaler()
     
-    def remove_outliers_iqr(self, X, multiplier=3):
-        """Remove extreme outliers using IQR method"""
-        X_clean = X.copy()
+    def iqr_bounds(self, X, multiplier=3):
+        """Per-column (lower, upper) clip bounds from the IQR of X"""
+        bounds = {}
         for col in self.columns:
-            Q1 = X_clean[col].quantile(0.25)
-            Q3 = X_clean[col].quantile(0.75)
+            Q1 = X[col].quantile(0.25)
+            Q3 = X[col].quantile(0.75)
             IQR = Q3 - Q1
-            lower_bound = Q1 - multiplier * IQR
-            upper_bound = Q3 + multiplier * IQR
+            bounds[col] = (Q1 - multiplier * IQR, Q3 + multiplier * IQR)
+        return bounds
+
+    def remove_outliers_iqr(self, X, multiplier=3, bounds=None):
+        """Remove extreme outliers using IQR method (bounds from X itself unless given)"""
+        X_clean = X.copy()
+        if bounds is None:
+            bounds = self.iqr_bounds(X_clean, multiplier)
+        for col in self.columns:
+            lower_bound, upper_bound = bounds[col]
             X_clean[col] = X_clean[col].clip(lower_bound, upper_bound)
         return X_clean
     
@@ -64,14 +183,19 @@ class DataProcessor:
         
         return X_train, X_test, y_train, y_test
     
+    @profiled("scale_data")
     def scale_data(self, X_train, X_test):
         X_train_scaled = X_train.copy()
         X_test_scaled = X_test.copy()
+        # Column layout the model is trained on, so serving can select it from request frames
+        self.feature_columns = list(X_train.columns)
 
-        # Remove extreme outliers if specified
+        # Remove extreme outliers if specified; bounds come from training data only, so a row is
+        # clipped the same way whatever else is in its batch
         if self.scaler_type == 'outlier_removal':
-            X_train_scaled = self.remove_outliers_iqr(X_train_scaled, multiplier=3)
-            X_test_scaled = self.remove_outliers_iqr(X_test_scaled, multiplier=3)
+            self.outlier_bounds = self.iqr_bounds(X_train_scaled, multiplier=3)
+            X_train_scaled = self.remove_outliers_iqr(X_train_scaled, bounds=self.outlier_bounds)
+            X_test_scaled = self.remove_outliers_iqr(X_test_scaled, bounds=self.outlier_bounds)
             # Then apply standard scaling
             self.scaler = StandardScaler()
         
@@ -79,22 +203,45 @@ class DataProcessor:
         X_test_scaled[self.columns] = self.scaler.transform(X_test_scaled[self.columns])
         return X_train_scaled, X_test_scaled
 
+    def transform(self, X):
+        """Scale new data with the scaler fitted in scale_data"""
+        X_scaled = X.copy()
+        if self.scaler_type == 'outlier_removal':
+            X_scaled = self.remove_outliers_iqr(X_scaled, bounds=self.outlier_bounds)
+        X_scaled[self.columns] = self.scaler.transform(X_scaled[self.columns])
+        return X_scaled
+
 
 
 if __name__ == '__main__':
+    import time
+
+    file = str(Path(__file__).parent.parent.parent / "data" / "UCI_Credit_Card.csv")
+
+    loader = DataLoader(file)
+    loader.load_data()
+    df = loader.clean_data()
+    #print(loader.data_informer())
+
+    columns = [col for col in df.columns if df[col].nunique() > 10 and col != 'ID']
+
     # Try different scaling methods
     print("="*60)
     print("Testing different scaling methods:")
     print("="*60)
     
     scalers = ['power', 'quantile', 'outlier_removal', 'standard']
+
+    # One split shared by every scaler so the comparison is like-for-like
+    X_train, X_test, y_train, y_test = DataProcessor(columns).split_data(df, target_col='default.payment.next.month')
     
     for scaler_type in scalers:
         print(f"\n--- {scaler_type.upper()} Scaler ---")
         processor = DataProcessor(columns, scaler_type=scaler_type)
-        X_train, X_test, y_train, y_test = processor.split_data(df, target_col='default.payment.next.month')
+        start = time.perf_counter()
         X_train_scaled, X_test_scaled = processor.scale_data(X_train, X_test)
         
+        print(f"Scaling time: {time.perf_counter() - start:.3f}s")
         print(f"Training data shape: {X_train_scaled.shape}")
         print(f"Testing data shape: {X_test_scaled.shape}")
         print(f"Train mean: {X_train_scaled[columns].mean().mean():.6f}")
@@ -0,0 +1,69 @@
+"""
+Base Model Comparison
+Tunes registry models on the same split and reports training time and test ROC-AUC
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import argparse
+import time
+
+import pandas as pd
+from sklearn.metrics import roc_auc_score
+
+from data_procession.data_loader import DataLoader
+from data_procession.processing import DataProcessor
+from models.model_registry import MODEL_REGISTRY
+from models.train import StackedEnsembleTrainer, SharedTrainingData
+
+
+def compare_models(names, X_train, y_train, X_test, y_test, n_trials=20, n_splits=5):
+    trainer = StackedEnsembleTrainer([], None, n_splits=n_splits, n_trials=n_trials)
+    rows = []
+    with SharedTrainingData(X_train, y_train, n_splits) as shared:
+        for name in names:
+            model = MODEL_REGISTRY[name].create()
+
+            start = time.perf_counter()
+            model.fit(X_train, y_train)
+            default_fit = time.perf_counter() - start
+            default_auc = roc_auc_score(y_test, model.predict_proba(X_test)[:, 1])
+
+            start = time.perf_counter()
+            tuned, _ = trainer.tune_base_model(MODEL_REGISTRY[name].create(), X_train, y_train, shared,
+                                               name=name)
+            tuning_time = time.perf_counter() - start
+            tuned_auc = roc_auc_score(y_test, tuned.predict_proba(X_test)[:, 1])
+
+            rows.append({'model': name,
+                         'default_fit_s': round(default_fit, 2),
+                         'default_test_auc': round(default_auc, 4),
+                         'tuning_s': round(tuning_time, 2),
+                         'tuned_test_auc': round(tuned_auc, 4)})
+    return pd.DataFrame(rows)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare base models from the registry")
+    parser.add_argument('--models', nargs='+', default=['gradient_boosting', 'hist_gradient_boosting'],
+                        choices=sorted(MODEL_REGISTRY))
+    parser.add_argument('--n-trials', type=int, default=20)
+    args = parser.parse_args()
+
+    file_path = str(Path(__file__).parent.parent.parent / "data" / "UCI_Credit_Card.csv")
+    data_loader = DataLoader(filepath=file_path)
+    data_loader.load_data()
+    df = data_loader.clean_data()
+
+    columns = [col for col in df.columns if df[col].nunique() > 10 and col != 'ID' and col != 'default.payment.next.month']
+    processor = DataProcessor(columns, scaler_type='power')
+    X_train, X_test, y_train, y_test = processor.split_data(df, target_col='default.payment.next.month')
+    X_train_scaled, X_test_scaled = processor.scale_data(X_train, X_test)
+
+    results = compare_models(args.models, X_train_scaled, y_train, X_test_scaled, y_test,
+                             n_trials=args.n_trials)
+    print("\n" + "=" * 60)
+    print("Base model comparison")
+    print("=" * 60)
+    print(results.to_string(index=False))
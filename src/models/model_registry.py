@@ -0,0 +1,120 @@
+"""
+Base Model Registry
+Declares each base model's estimator factory, Optuna search space and parallelism hints
+"""
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sklearn.ensemble import (
+    ExtraTreesClassifier, GradientBoostingClassifier, HistGradientBoostingClassifier
+)
+from sklearn.neighbors import KNeighborsClassifier
+
+
+class ModelSpec:
+    """Registry entry for one base model"""
+    def __init__(self, name: str, estimator: type, search_space: Callable,
+                 params: Optional[Dict] = None, cv_n_jobs: int = -1):
+        """
+        Args:
+            name: Registry key used in configs and on the command line
+            estimator: Estimator class
+            search_space: Function mapping an Optuna trial to estimator params
+            params: Fixed constructor params applied before tuning
+            cv_n_jobs: Parallel CV folds during tuning (passed to cross_validate)
+        """
+        self.name = name
+        self.estimator = estimator
+        self.search_space = search_space
+        self.params = params or {}
+        self.cv_n_jobs = cv_n_jobs
+
+    def create(self):
+        return self.estimator(**self.params)
+
+
+MODEL_REGISTRY: Dict[str, ModelSpec] = {}
+
+DEFAULT_BASE_MODELS = ['extra_trees', 'knn', 'gradient_boosting']
+
+
+def register_model(spec: ModelSpec) -> ModelSpec:
+    MODEL_REGISTRY[spec.name] = spec
+    return spec
+
+
+def get_model_spec(model) -> Optional[ModelSpec]:
+    """
+    Look up a spec by registry name, or by estimator class when a single entry uses that class
+
+    Raises:
+        ValueError: if several entries share the estimator's class; pass the registry name instead
+    """
+    if isinstance(model, str):
+        return MODEL_REGISTRY[model]
+    matches = [spec for spec in MODEL_REGISTRY.values() if type(model) is spec.estimator]
+    if len(matches) > 1:
+        raise ValueError(f"{type(model).__name__} is registered as {[spec.name for spec in matches]}; "
+                         f"pass the registry name")
+    return matches[0] if matches else None
+
+
+def named_models(models: list) -> List[Tuple[Optional[str], object]]:
+    """Normalize estimators or (registry name, estimator) pairs to pairs; bare estimators get None"""
+    return [model if isinstance(model, tuple) else (None, model) for model in models]
+
+
+def build_models(names: List[str] = None) -> List[Tuple[str, object]]:
+    """(registry name, fresh estimator) pairs, ready for StackedEnsembleTrainer"""
+    return [(name, MODEL_REGISTRY[name].create()) for name in (names or DEFAULT_BASE_MODELS)]
+
+
+def _extra_trees_space(trial):
+    return {
+        'n_estimators': trial.suggest_int('n_estimators', 50, 300),
+        'max_depth': trial.suggest_int('max_depth', 5, 30),
+        'min_samples_split': trial.suggest_int('min_samples_split', 2, 10),
+        'min_samples_leaf': trial.suggest_int('min_samples_leaf', 1, 5),
+        'bootstrap': trial.suggest_categorical('bootstrap', [True, False]),
+    }
+
+
+def _knn_space(trial):
+    return {
+        'n_neighbors': trial.suggest_int('n_neighbors', 3, 15),
+        'weights': trial.suggest_categorical('weights', ['uniform', 'distance']),
+        'p': trial.suggest_categorical('p', [1, 2]),
+    }
+
+
+def _gradient_boosting_space(trial):
+    return {
+        'n_estimators': trial.suggest_int('n_estimators', 50, 300),
+        'max_depth': trial.suggest_int('max_depth', 3, 15),
+        'learning_rate': trial.suggest_float('learning_rate', 0.01, 0.3, log=True),
+        'subsample': trial.suggest_float('subsample', 0.5, 1.0),
+        'min_samples_split': trial.suggest_int('min_samples_split', 2, 20),
+        'min_samples_leaf': trial.suggest_int('min_samples_leaf', 1, 10),
+    }
+
+
+def _hist_gradient_boosting_space(trial):
+    return {
+        'max_iter': trial.suggest_int('max_iter', 50, 500),
+        'learning_rate': trial.suggest_float('learning_rate', 0.01, 0.3, log=True),
+        'max_leaf_nodes': trial.suggest_int('max_leaf_nodes', 15, 255, log=True),
+        'max_depth': trial.suggest_int('max_depth', 3, 15),
+        'min_samples_leaf': trial.suggest_int('min_samples_leaf', 10, 100),
+        'l2_regularization': trial.suggest_float('l2_regularization', 1e-8, 10.0, log=True),
+    }
+
+
+register_model(ModelSpec('extra_trees', ExtraTreesClassifier, _extra_trees_space,
+                         params={'random_state': 42, 'n_jobs': -1}))
+register_model(ModelSpec('knn', KNeighborsClassifier, _knn_space))
+register_model(ModelSpec('gradient_boosting', GradientBoostingClassifier, _gradient_boosting_space,
+                         params={'random_state': 42}))
+# Bins features into at most 255 buckets and grows trees on histograms with OpenMP threads;
+# joblib caps those threads inside each CV worker, so folds can still run in parallel
+register_model(ModelSpec('hist_gradient_boosting', HistGradientBoostingClassifier,
+                         _hist_gradient_boosting_space,
+                         params={'random_state': 42, 'early_stopping': True}))
@@ -6,6 +6,9 @@ import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+import hashlib
+
+import numpy as np
 import pandas as pd
 import joblib
 import logging
@@ -13,35 +16,78 @@ from typing import Dict, List, Union
 
 from data_procession.data_loader import DataLoader
 from data_procession.processing import DataProcessor
+from utils.data_utils import FEATURE_ALIASES
+from utils.profiling_utils import profiled
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+ARTIFACTS_DIR = Path(__file__).parent.parent.parent / "artifacts"
+
+RISK_THRESHOLDS = [0.2, 0.4, 0.6]
+RISK_LEVELS = np.array(["Low", "Medium", "High", "Very High"])
+MODEL_FILES = ("ensemble_model.pkl", "processor.pkl")
+
+
+def model_fingerprint(artifacts_dir=ARTIFACTS_DIR, chunk_size=1 << 20) -> str:
+    """Hash of the model and processor artifacts; identifies the model that produced a score"""
+    digest = hashlib.sha256()
+    for filename in MODEL_FILES:
+        with open(Path(artifacts_dir) / filename, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+    return digest.hexdigest()[:16]
+
 
 class CreditScorePredictor:
-    """Load trained ensemble model and make predictions"""
+    """Load trained ensemble model and the fitted DataProcessor, and score raw features"""
     
-    def __init__(self):
-        """Initialize predictor by loading ensemble trainer"""
+    def __init__(self, artifacts_dir=ARTIFACTS_DIR):
+        """Initialize predictor by loading ensemble trainer and processor"""
+        self.artifacts_dir = Path(artifacts_dir)
         self.model = None
+        self.processor = None
+        self.fingerprint = None
         self.columns = None
         self._load_model()
     
     def _load_model(self):
-        """Load ensemble trainer from artifact"""
+        """Load ensemble trainer and the processor it was trained behind"""
         try:
-            model_path = Path(__file__).parent.parent.parent / "artifacts" / "ensemble_model.pkl"
-            if not model_path.exists():
-                raise FileNotFoundError(f"Model not found at {model_path}")
+            model_path, processor_path = (self.artifacts_dir / filename for filename in MODEL_FILES)
+            for path in (model_path, processor_path):
+                if not path.exists():
+                    raise FileNotFoundError(f"Artifact not found at {path}")
             
             self.model = joblib.load(model_path)
-            logger.info(f"Model loaded successfully from {model_path}")
+            self.processor = joblib.load(processor_path)
+            self.fingerprint = model_fingerprint(self.artifacts_dir)
+            logger.info(f"Model and processor loaded successfully from {self.artifacts_dir}")
             
         except Exception as e:
             logger.error(f"Failed to load model: {e}")
             raise
+
+    def _model_input(self, X: pd.DataFrame) -> pd.DataFrame:
+        """Map request fields onto the training columns and scale them with the fitted processor"""
+        aliases = {alias: column for alias, column in FEATURE_ALIASES.items()
+                   if alias in X.columns and column not in X.columns}
+        if aliases:
+            X = X.rename(columns=aliases)
+        feature_columns = getattr(self.processor, 'feature_columns', None)
+        if feature_columns is not None:
+            X = X[feature_columns]
+        return self.processor.transform(X)
+
+    def score(self, X: pd.DataFrame) -> np.ndarray:
+        """Default probabilities for raw feature rows, scaled exactly as in training"""
+        y_proba = np.asarray(self.model.predict(self._model_input(X)))
+        if y_proba.ndim == 2:
+            y_proba = y_proba[:, 1] if y_proba.shape[1] > 1 else y_proba[:, 0]
+        return y_proba
     
+    @profiled("predict")
     def predict(self, X: pd.DataFrame) -> Union[Dict, List[Dict]]:
         """
         Make predictions on new data
@@ -53,15 +99,7 @@ class CreditScorePredictor:
             Single dict for 1 row, list of dicts for multiple rows
         """
         try:
-            # The model expects the same features it was trained with
-            # Don't filter - pass all columns as-is
-            
-            # StackedEnsembleTrainer.predict handles scaling internally
-            y_proba = self.model.predict(X)
-            
-            # Handle output format
-            if len(y_proba.shape) == 2:
-                y_proba = y_proba[:, 1] if y_proba.shape[1] > 1 else y_proba[:, 0]
+            y_proba = self.score(X)
             
             # Format results
             results = []
@@ -84,6 +122,17 @@ class CreditScorePredictor:
             logger.error(f"Prediction error: {e}")
             raise
     
+    def predict_arrays(self, X: pd.DataFrame) -> Dict:
+        """Vectorized predict returning one sequence per output field (column-oriented)"""
+        y_proba = self.score(X)
+        pred = (y_proba > 0.5).astype(int)
+        return {
+            'default_probability': np.round(y_proba, 4),
+            'default_prediction': pred,
+            'default_label': np.where(pred == 1, 'Default', 'No Default').tolist(),
+            'risk_level': RISK_LEVELS[np.searchsorted(RISK_THRESHOLDS, y_proba, side='right')].tolist(),
+        }
+
     def predict_batch(self, X: pd.DataFrame) -> pd.DataFrame:
         """Make predictions on batch and return as DataFrame"""
         predictions = self.predict(X)
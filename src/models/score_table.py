@@ -0,0 +1,80 @@
+"""
+Precomputed Score Table
+Memory-mapped table of scaled feature rows and default probabilities keyed by customer ID
+"""
+import json
+import os
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+SCORE_TABLE_DIR = Path(__file__).parent.parent.parent / "artifacts" / "score_table"
+TABLE_FILE = "score_table.npy"
+META_FILE = "score_table.json"
+
+
+class ScoreTable:
+    """Read-only lookup of precomputed scores by customer ID"""
+    def __init__(self, directory=SCORE_TABLE_DIR):
+        directory = Path(directory)
+        with open(directory / META_FILE) as f:
+            meta = json.load(f)
+        self.columns = meta['columns']
+        # Fingerprint of the model and processor the scores and scaled rows came from
+        self.model_fingerprint = meta.get('model_fingerprint')
+        self.table = np.load(directory / TABLE_FILE, mmap_mode='r')
+        # IDs are small and hit on every lookup, so keep a contiguous copy in memory
+        self.ids = np.ascontiguousarray(self.table['ID'])
+
+    def __len__(self):
+        return len(self.ids)
+
+    def find(self, customer_id: int) -> Optional[int]:
+        """Row index of customer_id via binary search over the sorted IDs"""
+        idx = int(np.searchsorted(self.ids, customer_id))
+        if idx < len(self.ids) and self.ids[idx] == customer_id:
+            return idx
+        return None
+
+    def score(self, idx: int) -> float:
+        return float(self.table['score'][idx])
+
+    def features(self, idx: int) -> pd.DataFrame:
+        """Scaled model input row, ready for StackedEnsembleTrainer.predict"""
+        # Copy the row out of the read-only mapping; sklearn validation needs a writeable array
+        return pd.DataFrame(np.array(self.table['features'][idx:idx + 1]), columns=self.columns)
+
+    @staticmethod
+    def build(ids: np.ndarray, features: np.ndarray, scores: np.ndarray,
+              columns: List[str], directory=SCORE_TABLE_DIR,
+              model_fingerprint: Optional[str] = None) -> Path:
+        """
+        Write a table sorted by ID, replacing any previous one atomically
+
+        Args:
+            model_fingerprint: models.predict.model_fingerprint of the artifacts that produced
+                               the scores; the API only serves the table for that model
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        order = np.argsort(ids, kind='stable')
+        # float64 rows so ?rescore=true sees exactly the values the stored score was computed on
+        dtype = np.dtype([('ID', np.int64), ('score', np.float64),
+                          ('features', np.float64, (len(columns),))])
+
+        tmp_path = directory / f"{TABLE_FILE}.tmp"
+        table = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=dtype, shape=(len(ids),))
+        table['ID'] = np.asarray(ids)[order]
+        table['score'] = np.asarray(scores)[order]
+        table['features'] = np.asarray(features, dtype=np.float64)[order]
+        table.flush()
+        del table
+
+        with open(directory / f"{META_FILE}.tmp", 'w') as f:
+            json.dump({'columns': list(columns), 'n_rows': int(len(ids)),
+                       'model_fingerprint': model_fingerprint}, f, indent=2)
+        os.replace(tmp_path, directory / TABLE_FILE)
+        os.replace(directory / f"{META_FILE}.tmp", directory / META_FILE)
+        return directory / TABLE_FILE
@@ -6,14 +6,19 @@ import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+import os
+import shutil
+import tempfile
+import time
+from contextlib import nullcontext
+
 import numpy as np
 import pandas as pd
 import joblib
+from joblib import Parallel, delayed
 import optuna
 from optuna.samplers import TPESampler
 from optuna.pruners import MedianPruner
-from sklearn.ensemble import ExtraTreesClassifier, GradientBoostingClassifier
-from sklearn.neighbors import KNeighborsClassifier
 from sklearn.linear_model import LogisticRegression
 from sklearn.model_selection import cross_validate, StratifiedKFold
 from sklearn.base import clone
@@ -22,90 +27,179 @@ warnings.filterwarnings('ignore')
 
 from data_procession.processing import DataProcessor
 from data_procession.data_loader import DataLoader
+from models.model_registry import get_model_spec, build_models, named_models
+from utils.profiling_utils import profiled
+from utils.resource_utils import ResourceTracker, peak_rss_since_reset, reset_peak_rss, MB
+
+
+class SharedTrainingData:
+    """
+    Training matrix dumped once as a contiguous float32 memmap, plus precomputed fold indices.
+
+    joblib hands np.memmap arrays to loky workers by filename, so every CV and stacking
+    worker reads the same pages instead of unpickling its own copy of the DataFrame.
+
+    Without a directory the memmap lives in a temporary directory removed by close().
+    With one, it is kept there and reused if already present, and the object pickles as a
+    handle that reopens the file, so one dump can be shared across pipeline stages.
+    """
+    def __init__(self, X, y, n_splits=5, random_state=42, directory=None):
+        self._owns_dir = directory is None
+        self._dir = tempfile.mkdtemp(prefix='credit_scoring_') if directory is None else str(directory)
+        os.makedirs(self._dir, exist_ok=True)
+        self.path = os.path.join(self._dir, 'X_train.mmap')
+        if not os.path.exists(self.path):
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            joblib.dump(np.ascontiguousarray(X, dtype=np.float32), tmp_path)
+            os.replace(tmp_path, self.path)
+        self.X = joblib.load(self.path, mmap_mode='r')
+        self.y = np.ascontiguousarray(y)
+        skf = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+        self.folds = list(skf.split(self.X, self.y))
+
+    def close(self):
+        if self._owns_dir:
+            shutil.rmtree(self._dir, ignore_errors=True)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['X'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.X = joblib.load(self.path, mmap_mode='r')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _fit_fold_proba(model, X, y, train_idx, val_idx):
+    # Measured inside the worker. loky workers are reused across folds and models, so the RSS
+    # high-water mark is reset first; where that is unsupported the peak is left out rather
+    # than reporting the worker's lifetime maximum
+    peak_reset = reset_peak_rss()
+    start, cpu_start = time.perf_counter(), time.process_time()
+    model.fit(X[train_idx], y[train_idx])
+    proba = model.predict_proba(X[val_idx])[:, 1]
+    stats = {'wall_s': time.perf_counter() - start, 'cpu_s': time.process_time() - cpu_start}
+    if peak_reset:
+        stats['peak_rss_mb'] = peak_rss_since_reset() / MB
+    return proba, stats
 
 
 class StackedEnsembleTrainer:
     """Professional Stacked Ensemble Model"""
-    def __init__(self, base_models, meta_model, n_splits=5):
-        self.base_models = base_models
+    def __init__(self, base_models, meta_model, n_splits=5, n_trials=20):
+        """
+        Args:
+            base_models: Estimators, or (registry name, estimator) pairs as returned by build_models.
+                         Names select the registry entry; bare estimators are looked up by class.
+        """
+        pairs = named_models(base_models)
+        self.model_names = [name for name, _ in pairs]
+        self.base_models = [model for _, model in pairs]
         self.meta_model = meta_model
         self.n_splits = n_splits
+        self.n_trials = n_trials
+        # Wall time, CPU time and peak RSS of every study, trial, stacking fold and meta-model fit
+        self.resource_records = []
+
+    def _shared(self, X, y, shared):
+        return nullcontext(shared) if shared is not None else SharedTrainingData(X, y, self.n_splits)
+
+    def _tracker(self, tracker):
+        return nullcontext(tracker) if tracker is not None else ResourceTracker(self.resource_records)
 
-    def train_base_models(self, X, y):
+    def train_base_models(self, X, y, shared=None, tracker=None):
         self.fitted_base_models = []
-        skf = StratifiedKFold(n_splits=self.n_splits, shuffle=True, random_state=42)
-
-        for model in self.base_models:
-            study = optuna.create_study(direction='maximize',
-                                        sampler=TPESampler(seed=42),
-                                        pruner=MedianPruner(n_startup_trials=5))
-            func = self.objective_function(model, X, y, skf)
-            study.optimize(func, n_trials=20, n_jobs=1)
-            best_model = model.set_params(**study.best_params)
-            best_model.fit(X, y)
-            self.fitted_base_models.append(best_model)
-            print(f"Trained {model.__class__.__name__} with best params: {study.best_params}")
-
-    def objective_function(self, model, X, y, skf):
+
+        with self._shared(X, y, shared) as shared, self._tracker(tracker) as tracker:
+            for name, model in zip(self.model_names, self.base_models):
+                best_model, _ = self.tune_base_model(model, X, y, shared, tracker, name=name)
+                self.fitted_base_models.append(best_model)
+
+    @profiled(lambda self, model, *args, name=None, **kwargs: f"tune_{name or model.__class__.__name__}")
+    def tune_base_model(self, model, X, y, shared=None, tracker=None, name=None):
+        """Tune a single base model with Optuna and refit it on the full data"""
+        label = name or model.__class__.__name__
+        study = optuna.create_study(direction='maximize',
+                                    sampler=TPESampler(seed=42),
+                                    pruner=MedianPruner(n_startup_trials=5))
+        with self._shared(X, y, shared) as shared, self._tracker(tracker) as tracker:
+            with tracker.track(f"tune.{label}"):
+                func = self.objective_function(model, shared, tracker, name=name)
+                study.optimize(func, n_trials=self.n_trials, n_jobs=1)
+            with tracker.track(f"refit.{label}"):
+                best_model = model.set_params(**study.best_params)
+                best_model.fit(X, y)
+        print(f"Trained {label} with best params: {study.best_params}")
+        return best_model, study.best_params
+
+    def objective_function(self, model, shared, tracker=None, name=None):
+        spec = get_model_spec(name if name is not None else model)
+        cv_n_jobs = spec.cv_n_jobs if spec else -1
+        label = name or model.__class__.__name__
+
         def func(trial):
-            param_grid = self.get_param_grid(model, trial)
+            param_grid = self.get_param_grid(model, trial, name=name)
             model.set_params(**param_grid)
-            scores = cross_validate(model, X, y, cv=skf, scoring='roc_auc', n_jobs=-1)
+            with tracker.track(f"trial.{label}", step=trial.number) if tracker else nullcontext():
+                scores = cross_validate(model, shared.X, shared.y, cv=shared.folds,
+                                        scoring='roc_auc', n_jobs=cv_n_jobs)
             return np.mean(scores['test_score'])
         
         return func
     
-    def get_param_grid(self, model, trial):
-        if isinstance(model, ExtraTreesClassifier):
-            return {
-                'n_estimators': trial.suggest_int('n_estimators', 50, 300),
-                'max_depth': trial.suggest_int('max_depth', 5, 30),
-                'min_samples_split': trial.suggest_int('min_samples_split', 2, 10),
-                'min_samples_leaf': trial.suggest_int('min_samples_leaf', 1, 5),
-                'bootstrap': trial.suggest_categorical('bootstrap', [True, False]),
-            }
-        elif isinstance(model, KNeighborsClassifier):
-            return {
-                'n_neighbors': trial.suggest_int('n_neighbors', 3, 15),
-                'weights': trial.suggest_categorical('weights', ['uniform', 'distance']),
-                'p': trial.suggest_categorical('p', [1, 2]),
-            }
-        elif isinstance(model, GradientBoostingClassifier):
-            return {
-                'n_estimators': trial.suggest_int('n_estimators', 50, 300),
-                'max_depth': trial.suggest_int('max_depth', 3, 15),
-                'learning_rate': trial.suggest_float('learning_rate', 0.01, 0.3, log=True),
-                'subsample': trial.suggest_float('subsample', 0.5, 1.0),
-                'min_samples_split': trial.suggest_int('min_samples_split', 2, 20),
-                'min_samples_leaf': trial.suggest_int('min_samples_leaf', 1, 10),
-            }
-        return {}
+    def get_param_grid(self, model, trial, name=None):
+        spec = get_model_spec(name if name is not None else model)
+        return spec.search_space(trial) if spec else {}
     
     def train_meta_model(self, X_meta, y_meta):
         self.meta_model.fit(X_meta, y_meta)
         print(f'Trained Meta Model: {self.meta_model.__class__.__name__}')
 
-    def fit(self, X, y):
-        self.train_base_models(X, y)
-        skf = StratifiedKFold(n_splits=self.n_splits, shuffle=True, random_state=42)
+    def fit(self, X, y, mlflow_logger=None):
+        """
+        Tune the base models and fit the stack
+
+        Args:
+            mlflow_logger: Optional MlflowBatchLogger that receives each resource record as it is taken
+        """
+        with SharedTrainingData(X, y, self.n_splits) as shared, \
+                ResourceTracker(self.resource_records, sink=mlflow_logger) as tracker:
+            self.train_base_models(X, y, shared, tracker)
+            self.fit_stacking(X, y, shared, tracker)
+
+    @profiled("fit_stacking")
+    def fit_stacking(self, X, y, shared=None, tracker=None):
+        """Build out-of-fold meta-features from the tuned base models and fit the meta-model"""
         X_meta = np.zeros((X.shape[0], len(self.fitted_base_models)))
         y_meta = y.copy()
         
         print("Generating meta-features using cross-validation...")
-        for fold, (train_idx, val_idx) in enumerate(skf.split(X, y)):
-            X_train, X_val = X.iloc[train_idx], X.iloc[val_idx]
-            y_train, y_val = y.iloc[train_idx], y.iloc[val_idx]
-            
-            # Train temporary models on this fold
-            for i, base_model in enumerate(self.base_models):
-                temp_model = clone(base_model)
-                temp_model.fit(X_train, y_train)
-                X_meta[val_idx, i] = temp_model.predict_proba(X_val)[:, 1]
-            
-            print(f"  ✓ Fold {fold + 1}/{self.n_splits} completed")
-        
-        # Train meta-model on X_meta and y_meta
-        self.train_meta_model(X_meta, y_meta)
+        with self._shared(X, y, shared) as shared, self._tracker(tracker) as tracker:
+            # Train temporary models for every (fold, base model) pair in parallel
+            jobs = [(fold, i, train_idx, val_idx)
+                    for fold, (train_idx, val_idx) in enumerate(shared.folds)
+                    for i in range(len(self.base_models))]
+            with tracker.track("stack"):
+                results = Parallel(n_jobs=-1)(
+                    delayed(_fit_fold_proba)(clone(self.base_models[i]), shared.X, shared.y, train_idx, val_idx)
+                    for _, i, train_idx, val_idx in jobs
+                )
+            for (fold, i, _, val_idx), (proba, stats) in zip(jobs, results):
+                X_meta[val_idx, i] = proba
+                label = self.model_names[i] or self.base_models[i].__class__.__name__
+                tracker.add(f"stack_fold.{label}", step=fold, **stats)
+            print(f"  ✓ {self.n_splits} folds completed")
+
+            # Train meta-model on X_meta and y_meta
+            with tracker.track("meta_model"):
+                self.train_meta_model(X_meta, y_meta)
 
     def predict(self, X):
         meta_features = np.zeros((X.shape[0], len(self.fitted_base_models)))
@@ -131,11 +225,7 @@ if __name__ == '__main__':
     # Calculate scale_pos_weight for handling class imbalance
     scale_pos_weight = sum(y_train == 0) / sum(y_train == 1)
     
-    base_models = [
-        ExtraTreesClassifier(random_state=42, n_jobs=-1),
-        KNeighborsClassifier(),
-        GradientBoostingClassifier(random_state=42)
-    ]
+    base_models = build_models(['extra_trees', 'knn', 'gradient_boosting'])
     meta_model = LogisticRegression(random_state=42, max_iter=1000)
 
     # Train stacked ensemble
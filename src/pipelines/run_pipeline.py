@@ -1,3 +1,547 @@
 """
-Pipeline module - reserved for future use
+Complete ML Pipeline
+Runs load → clean → split → scale → tune → stack → evaluate → register as a DAG of cached stages.
+
+Every stage output is stored under artifacts/pipeline_cache/<stage>/<key>.joblib, where the key
+is a hash of the stage code, the source of the project modules it calls, its config and the keys
+of its inputs. Re-runs skip stages whose key is already on disk, and stages without a dependency
+between them (per-model tuning, evaluation plots) run in parallel. Registration is skipped when
+the trained stack's key is already tagged on an MLflow run, and only resource records measured
+by this invocation are logged; records inside cached tune outputs belong to an earlier one.
 """
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import argparse
+import hashlib
+import inspect
+import io
+import json
+import os
+import platform
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+import joblib
+import psutil
+from sklearn.base import clone
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import (
+    roc_auc_score, accuracy_score, precision_score, recall_score, f1_score,
+    confusion_matrix, roc_curve, auc
+)
+
+from data_procession import data_loader, processing
+from data_procession.data_loader import DataLoader
+from data_procession.processing import DataProcessor
+from models import model_registry, train
+from models.train import StackedEnsembleTrainer, SharedTrainingData
+from models.model_registry import build_models, DEFAULT_BASE_MODELS, MODEL_REGISTRY
+from utils import monitoring_utils
+from utils.mlflow_utils import MlflowBatchLogger
+from utils.monitoring_utils import DriftMonitor
+from utils.resource_utils import ResourceMonitor
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+DATA_PATH = PROJECT_ROOT / "data" / "UCI_Credit_Card.csv"
+ARTIFACTS_DIR = PROJECT_ROOT / "artifacts"
+CACHE_DIR = ARTIFACTS_DIR / "pipeline_cache"
+TARGET_COL = 'default.payment.next.month'
+MODEL_KEY_TAG = 'pipeline_model_key'
+MODEL_KEY_FILE = ARTIFACTS_DIR / "model_key.txt"
+
+
+def default_config():
+    """Configuration of a full training run"""
+    return {
+        'data_path': str(DATA_PATH),
+        'target_col': TARGET_COL,
+        'test_size': 0.2,
+        'random_state': 42,
+        'scaler_type': 'power',
+        'n_splits': 5,
+        'n_trials': 20,
+        'threshold': 0.3,
+        'base_models': list(DEFAULT_BASE_MODELS),
+        'meta_model': LogisticRegression(random_state=42, max_iter=1000),
+        'experiment_name': 'credit_scoring_ensemble',
+        'registered_model_name': 'credit_scoring_ensemble',
+    }
+
+
+def file_md5(path, chunk_size=1 << 20):
+    """Hash file contents so the load stage is keyed on the data, not its path"""
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def module_fingerprint(module):
+    """Hash of a module's source, so stages are re-run when the code they call changes"""
+    return hashlib.sha256(inspect.getsource(module).encode()).hexdigest()[:16]
+
+
+def _describe(obj):
+    """JSON fallback used when hashing stage configs"""
+    if hasattr(obj, 'get_params'):
+        return {'class': type(obj).__qualname__, 'params': obj.get_params(deep=False)}
+    return repr(obj)
+
+
+class Stage:
+    """
+    Single pipeline step computed from the outputs of its dependencies
+
+    Args:
+        modules: Project modules the stage calls into; their source is part of the cache key
+        pass_keys: Call func with input_keys={dep: key} in addition to the dependency outputs
+        pass_run_id: Call func with run_id, the ID of the current Pipeline.run (not part of the key)
+    """
+    def __init__(self, name, func, deps=(), config=None, cacheable=True, modules=(), pass_keys=False,
+                 pass_run_id=False):
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+        self.config = config or {}
+        self.cacheable = cacheable
+        self.modules = list(modules)
+        self.pass_keys = pass_keys
+        self.pass_run_id = pass_run_id
+
+
+class Pipeline:
+    """Executes stages in dependency order with content-addressed caching"""
+    def __init__(self, stages, cache_dir=CACHE_DIR, use_cache=True, max_workers=4):
+        self.stages = {stage.name: stage for stage in stages}
+        self.cache_dir = Path(cache_dir)
+        self.use_cache = use_cache
+        self.max_workers = max_workers
+        self.keys = {}
+        self.outputs = {}
+        self.report = []
+        self.run_id = uuid.uuid4().hex
+        self._lock = threading.Lock()
+
+    def stage_key(self, name):
+        """Hash of the stage code, the modules it calls, its config and upstream keys"""
+        if name not in self.keys:
+            stage = self.stages[name]
+            payload = json.dumps({
+                'stage': name,
+                'code': inspect.getsource(stage.func),
+                'modules': {module.__name__: module_fingerprint(module) for module in stage.modules},
+                'config': stage.config,
+                'inputs': [self.stage_key(dep) for dep in stage.deps],
+            }, sort_keys=True, default=_describe)
+            self.keys[name] = hashlib.sha256(payload.encode()).hexdigest()[:16]
+        return self.keys[name]
+
+    def _cache_path(self, name):
+        return self.cache_dir / name / f"{self.stage_key(name)}.joblib"
+
+    def _is_cached(self, name):
+        stage = self.stages[name]
+        return self.use_cache and stage.cacheable and self._cache_path(name).exists()
+
+    def _output(self, name):
+        """Return a stage output, loading it from the cache on first use"""
+        with self._lock:
+            if name not in self.outputs:
+                self.outputs[name] = joblib.load(self._cache_path(name))
+            return self.outputs[name]
+
+    def _execute(self, name, monitor):
+        stage = self.stages[name]
+        inputs = [self._output(dep) for dep in stage.deps]
+
+        kwargs = dict(stage.config)
+        if stage.pass_keys:
+            kwargs['input_keys'] = {dep: self.stage_key(dep) for dep in stage.deps}
+        if stage.pass_run_id:
+            kwargs['run_id'] = self.run_id
+
+        monitor.begin(name)
+        start = time.perf_counter()
+        output = stage.func(*inputs, **kwargs)
+        elapsed = time.perf_counter() - start
+        peak_rss = monitor.end(name)
+
+        if stage.cacheable:
+            path = self._cache_path(name)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+            joblib.dump(output, tmp_path)
+            os.replace(tmp_path, path)
+
+        with self._lock:
+            self.outputs[name] = output
+        return {'stage': name, 'status': 'ran', 'seconds': elapsed,
+                'peak_rss_mb': peak_rss / (1024**2)}
+
+    def run(self):
+        for name in self.stages:
+            self.stage_key(name)
+
+        done = set()
+        for name in self.stages:
+            if self._is_cached(name):
+                done.add(name)
+                self.report.append({'stage': name, 'status': 'cached', 'seconds': 0.0,
+                                    'peak_rss_mb': None})
+                print(f"  ↷ {name} cached ({self.keys[name]})")
+
+        monitor = ResourceMonitor().start()
+        running = {}
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                while len(done) < len(self.stages):
+                    for name, stage in self.stages.items():
+                        if name in done or name in running.values():
+                            continue
+                        if all(dep in done for dep in stage.deps):
+                            print(f"  ▶ {name}")
+                            running[executor.submit(self._execute, name, monitor)] = name
+                    if not running:
+                        raise RuntimeError("Pipeline has unresolved dependencies")
+
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        name = running.pop(future)
+                        result = future.result()
+                        self.report.append(result)
+                        done.add(name)
+                        print(f"  ✓ {name} ({result['seconds']:.2f}s)")
+        finally:
+            monitor.stop()
+        return self.outputs
+
+    def print_report(self):
+        print("\n" + "=" * 60)
+        print("PIPELINE REPORT")
+        print("=" * 60)
+        print(f"{'Stage':<36}{'Status':<10}{'Time (s)':>10}{'Peak RSS (MB)':>14}")
+        for row in self.report:
+            peak = f"{row['peak_rss_mb']:.1f}" if row['peak_rss_mb'] is not None else '-'
+            print(f"{row['stage']:<36}{row['status']:<10}{row['seconds']:>10.2f}{peak:>14}")
+        total = sum(row['seconds'] for row in self.report)
+        print(f"{'Total stage time':<46}{total:>10.2f}")
+        print("=" * 60)
+
+
+# Stage functions
+
+def load_stage(data_path, data_md5):
+    return DataLoader(data_path).load_data()
+
+
+def clean_stage(df):
+    loader = DataLoader(filepath=None)
+    loader.data = df
+    return loader.clean_data()
+
+
+def split_stage(df, target_col, test_size, random_state, scaler_type):
+    columns = [col for col in df.columns if df[col].nunique() > 10 and col != 'ID' and col != target_col]
+    processor = DataProcessor(columns, scaler_type=scaler_type)
+    X_train, X_test, y_train, y_test = processor.split_data(df, target_col=target_col,
+                                                           test_size=test_size,
+                                                           random_state=random_state)
+    return {'columns': columns, 'X_train': X_train, 'X_test': X_test,
+            'y_train': y_train, 'y_test': y_test}
+
+
+def scale_stage(split, scaler_type):
+    processor = DataProcessor(split['columns'], scaler_type=scaler_type)
+    X_train_scaled, X_test_scaled = processor.scale_data(split['X_train'], split['X_test'])
+    return {'processor': processor, 'X_train': X_train_scaled, 'X_test': X_test_scaled,
+            'y_train': split['y_train'], 'y_test': split['y_test']}
+
+
+def monitoring_reference_stage(split):
+    # Drift reference is taken on raw features, matching what the API receives
+    return DriftMonitor.from_training_data(split['X_train']).reference
+
+
+def shared_data_stage(data, n_splits, input_keys):
+    # One float32 memmap per scaled training set, opened by every tune and stack worker
+    directory = CACHE_DIR / "memmaps" / f"{input_keys['scale']}-{n_splits}"
+    return SharedTrainingData(data['X_train'], data['y_train'], n_splits, directory=directory)
+
+
+def _tag_records(records, run_id):
+    """Mark resource records with the pipeline run that measured them (earlier tags are kept)"""
+    for record in records:
+        record.setdefault('pipeline_run', run_id)
+    return records
+
+
+def _measured_records(records, run_id):
+    """Records measured by this pipeline run, dropping those carried in from cached stages"""
+    return [record for record in records if record.get('pipeline_run') == run_id]
+
+
+def tune_stage(data, shared, name, model, n_splits, n_trials, run_id):
+    trainer = StackedEnsembleTrainer([], None, n_splits=n_splits, n_trials=n_trials)
+    best_model, _ = trainer.tune_base_model(clone(model), data['X_train'], data['y_train'], shared,
+                                            name=name)
+    return {'name': name, 'model': best_model,
+            'resource_records': _tag_records(trainer.resource_records, run_id)}
+
+
+def stack_stage(data, shared, *tuned, meta_model, n_splits, run_id):
+    trainer = StackedEnsembleTrainer([(result['name'], result['model']) for result in tuned],
+                                     clone(meta_model), n_splits=n_splits)
+    trainer.fitted_base_models = [result['model'] for result in tuned]
+    # Keep the tuning records with the trainer; cached tune stages bring their original run tag
+    trainer.resource_records = [record for result in tuned for record in result['resource_records']]
+    trainer.fit_stacking(data['X_train'], data['y_train'], shared)
+    _tag_records(trainer.resource_records, run_id)
+    return trainer
+
+
+def calculate_metrics(y_true, y_pred, y_pred_proba):
+    """Calculate comprehensive evaluation metrics"""
+    return {
+        'ROC-AUC': roc_auc_score(y_true, y_pred_proba),
+        'Accuracy': accuracy_score(y_true, y_pred),
+        'Precision': precision_score(y_true, y_pred, zero_division=0),
+        'Recall': recall_score(y_true, y_pred, zero_division=0),
+        'F1-Score': f1_score(y_true, y_pred, zero_division=0)
+    }
+
+
+def evaluate_stage(data, trainer, threshold):
+    y_train_proba = trainer.predict(data['X_train'])
+    y_test_proba = trainer.predict(data['X_test'])
+    y_train_pred = (y_train_proba > threshold).astype(int)
+    y_test_pred = (y_test_proba > threshold).astype(int)
+    return {
+        'y_test': np.asarray(data['y_test']),
+        'y_test_proba': y_test_proba,
+        'y_test_pred': y_test_pred,
+        'train_metrics': calculate_metrics(data['y_train'], y_train_pred, y_train_proba),
+        'test_metrics': calculate_metrics(data['y_test'], y_test_pred, y_test_proba),
+    }
+
+
+def _figure_png(fig):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=150, bbox_inches='tight')
+    return buffer.getvalue()
+
+
+def plot_roc_stage(evaluation):
+    # Figure objects (not pyplot) so plots can render concurrently in worker threads
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=(7, 5))
+    ax = fig.subplots()
+    fpr, tpr, _ = roc_curve(evaluation['y_test'], evaluation['y_test_proba'])
+    ax.plot(fpr, tpr, color='darkorange', lw=2.5, label=f'ROC curve (AUC = {auc(fpr, tpr):.3f})')
+    ax.plot([0, 1], [0, 1], color='navy', lw=2, linestyle='--', label='Random Classifier')
+    ax.set_xlabel('False Positive Rate')
+    ax.set_ylabel('True Positive Rate')
+    ax.set_title('ROC Curve (Test Set)')
+    ax.legend(loc="lower right")
+    ax.grid(alpha=0.3)
+    return _figure_png(fig)
+
+
+def plot_confusion_stage(evaluation):
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=(6, 5))
+    ax = fig.subplots()
+    cm = confusion_matrix(evaluation['y_test'], evaluation['y_test_pred'])
+    ax.imshow(cm, cmap='Blues')
+    for (i, j), value in np.ndenumerate(cm):
+        ax.text(j, i, str(value), ha='center', va='center')
+    ax.set_xticks([0, 1], ['No Default', 'Default'])
+    ax.set_yticks([0, 1], ['No Default', 'Default'])
+    ax.set_xlabel('Predicted Label')
+    ax.set_ylabel('True Label')
+    ax.set_title('Confusion Matrix (Test Set)')
+    return _figure_png(fig)
+
+
+def plot_metrics_stage(evaluation):
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=(8, 5))
+    ax = fig.subplots()
+    train_metrics, test_metrics = evaluation['train_metrics'], evaluation['test_metrics']
+    names = list(test_metrics.keys())
+    x = np.arange(len(names))
+    width = 0.35
+    ax.bar(x - width/2, [train_metrics[m] for m in names], width, label='Train', alpha=0.8, color='green')
+    ax.bar(x + width/2, [test_metrics[m] for m in names], width, label='Test', alpha=0.8, color='red')
+    ax.set_xticks(x, names)
+    ax.set_ylim([0, 1])
+    ax.set_ylabel('Score')
+    ax.set_title('Train vs Test Performance')
+    ax.legend()
+    ax.grid(axis='y', alpha=0.3)
+    return _figure_png(fig)
+
+
+def _registered_run(model_key, experiment_name):
+    """Run ID of an earlier run tagged with this stack key, if any"""
+    import mlflow
+
+    runs = mlflow.search_runs(experiment_names=[experiment_name],
+                              filter_string=f"tags.{MODEL_KEY_TAG} = '{model_key}'",
+                              max_results=1, output_format='list')
+    return runs[0].info.run_id if runs else None
+
+
+def register_stage(data, trainer, evaluation, roc_png, confusion_png, metrics_png, monitoring_reference,
+                   experiment_name, registered_model_name, run_params, input_keys, run_id):
+    import mlflow
+
+    mlruns_dir = PROJECT_ROOT / "mlruns"
+    mlruns_dir.mkdir(parents=True, exist_ok=True)
+    mlflow.set_tracking_uri("file:///" + str(mlruns_dir))
+    mlflow.set_experiment(experiment_name)
+
+    # The stack key identifies the trained model, so an unchanged re-run registers nothing new
+    model_key = input_keys['stack']
+    existing_run_id = _registered_run(model_key, experiment_name)
+    artifacts_current = MODEL_KEY_FILE.exists() and MODEL_KEY_FILE.read_text().strip() == model_key
+    if existing_run_id is not None and artifacts_current:
+        print(f"↷ Model {model_key} already registered (Run ID: {existing_run_id}); nothing to do")
+        return existing_run_id
+
+    ARTIFACTS_DIR.mkdir(parents=True, exist_ok=True)
+    model_path = ARTIFACTS_DIR / "ensemble_model.pkl"
+    joblib.dump(trainer, model_path)
+    joblib.dump(data['processor'], ARTIFACTS_DIR / "processor.pkl")
+    plots = {'roc_curve.png': roc_png, 'confusion_matrix.png': confusion_png,
+             'metrics_comparison.png': metrics_png}
+    for filename, png in plots.items():
+        (ARTIFACTS_DIR / filename).write_bytes(png)
+    DriftMonitor(monitoring_reference).save(ARTIFACTS_DIR / "monitoring_reference.json")
+    MODEL_KEY_FILE.write_text(model_key)
+    print(f"✓ Model saved to {model_path}")
+    if existing_run_id is not None:
+        print(f"↷ Model {model_key} already registered (Run ID: {existing_run_id}); artifacts restored")
+        return existing_run_id
+
+    with mlflow.start_run(run_name="stacked_ensemble_pipeline") as run:
+        mlflow.log_params(run_params)
+        metrics = {}
+        for prefix in ('train', 'test'):
+            for metric_name, value in evaluation[f'{prefix}_metrics'].items():
+                metrics[f"{prefix}_{metric_name.lower().replace('-', '_')}"] = value
+        mlflow.log_metrics(metrics)
+        resource_logger = MlflowBatchLogger(run.info.run_id).start()
+        # Records from cached stages were measured (and logged) by the run that produced them
+        measured = _measured_records(trainer.resource_records, run_id)
+        resource_logger.log_records(measured)
+        reused = len(trainer.resource_records) - len(measured)
+        if reused:
+            print(f"↷ Skipped {reused} resource records from cached stages")
+        mlflow.set_tags({
+            "os": platform.system(),
+            "python_version": platform.python_version(),
+            "cpu_count": str(psutil.cpu_count()),
+            MODEL_KEY_TAG: model_key,
+        })
+        mlflow.log_artifact(str(model_path), artifact_path="model")
+        mlflow.log_artifact(str(ARTIFACTS_DIR / "processor.pkl"), artifact_path="model")
+        for filename in plots:
+            mlflow.log_artifact(str(ARTIFACTS_DIR / filename))
+        resource_logger.close()
+        run_id = run.info.run_id
+    print(f"✓ Run logged to MLflow (Run ID: {run_id})")
+
+    try:
+        version = mlflow.register_model(f"runs:/{run_id}/model", registered_model_name)
+        client = mlflow.tracking.MlflowClient()
+        client.transition_model_version_stage(name=registered_model_name,
+                                              version=version.version,
+                                              stage="Staging")
+        print(f"✓ Registered '{registered_model_name}' version {version.version} in Staging")
+    except Exception as e:
+        print(f"Could not register model: {e}")
+    return run_id
+
+
+def build_stages(config):
+    """Wire the stage functions into the training DAG"""
+    stages = [
+        Stage('load', load_stage,
+              config={'data_path': config['data_path'], 'data_md5': file_md5(config['data_path'])},
+              modules=[data_loader]),
+        Stage('clean', clean_stage, deps=['load'], modules=[data_loader]),
+        Stage('split', split_stage, deps=['clean'],
+              config={key: config[key] for key in ('target_col', 'test_size', 'random_state', 'scaler_type')},
+              modules=[processing]),
+        Stage('scale', scale_stage, deps=['split'], config={'scaler_type': config['scaler_type']},
+              modules=[processing]),
+        Stage('monitoring_reference', monitoring_reference_stage, deps=['split'],
+              modules=[monitoring_utils]),
+        Stage('shared_data', shared_data_stage, deps=['scale'], config={'n_splits': config['n_splits']},
+              modules=[train], pass_keys=True),
+    ]
+
+    tune_names = []
+    for model_name, model in build_models(config['base_models']):
+        name = f"tune_{model_name}"
+        tune_names.append(name)
+        stages.append(Stage(name, tune_stage, deps=['scale', 'shared_data'],
+                            config={'name': model_name, 'model': model, 'n_splits': config['n_splits'],
+                                    'n_trials': config['n_trials']},
+                            modules=[train, model_registry], pass_run_id=True))
+
+    stages += [
+        Stage('stack', stack_stage, deps=['scale', 'shared_data'] + tune_names,
+              config={'meta_model': config['meta_model'], 'n_splits': config['n_splits']},
+              modules=[train, model_registry], pass_run_id=True),
+        Stage('evaluate', evaluate_stage, deps=['scale', 'stack'],
+              config={'threshold': config['threshold']}, modules=[train]),
+        Stage('plot_roc', plot_roc_stage, deps=['evaluate']),
+        Stage('plot_confusion', plot_confusion_stage, deps=['evaluate']),
+        Stage('plot_metrics', plot_metrics_stage, deps=['evaluate']),
+        Stage('register', register_stage,
+              deps=['scale', 'stack', 'evaluate', 'plot_roc', 'plot_confusion', 'plot_metrics',
+                    'monitoring_reference'],
+              config={
+                  'experiment_name': config['experiment_name'],
+                  'registered_model_name': config['registered_model_name'],
+                  'run_params': {
+                      'scaler_type': config['scaler_type'],
+                      'n_splits': config['n_splits'],
+                      'n_trials': config['n_trials'],
+                      'base_models': config['base_models'],
+                      'meta_model': config['meta_model'].__class__.__name__,
+                      'test_size': config['test_size'],
+                      'threshold': config['threshold'],
+                  },
+              },
+              cacheable=False, pass_keys=True, pass_run_id=True),
+    ]
+    return stages
+
+
+def run_pipeline(config=None, use_cache=True, max_workers=4):
+    config = {**default_config(), **(config or {})}
+    pipeline = Pipeline(build_stages(config), use_cache=use_cache, max_workers=max_workers)
+    pipeline.run()
+    pipeline.print_report()
+    return pipeline
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the credit scoring training pipeline")
+    parser.add_argument('--no-cache', action='store_true', help="Recompute every stage")
+    parser.add_argument('--max-workers', type=int, default=4, help="Stages executed concurrently")
+    parser.add_argument('--n-trials', type=int, default=20, help="Optuna trials per base model")
+    parser.add_argument('--models', nargs='+', default=DEFAULT_BASE_MODELS, choices=sorted(MODEL_REGISTRY),
+                        help="Base models from the model registry")
+    args = parser.parse_args()
+
+    run_pipeline({'n_trials': args.n_trials, 'base_models': args.models},
+                 use_cache=not args.no_cache, max_workers=args.max_workers)
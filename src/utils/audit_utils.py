@@ -0,0 +1,277 @@
+"""
+Audit Logging Utilities
+Non-blocking JSONL audit trail of scoring requests and their results
+"""
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+MAX_RETRY_INTERVAL = 30.0
+
+
+def _json_default(obj):
+    # numpy arrays from the columnar API path are converted here, off the request path
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    return str(obj)
+
+
+class AuditLogFullError(RuntimeError):
+    """Raised when the audit queue stays full past the put timeout"""
+
+
+class AuditLogger:
+    """
+    Writes audit records from a background thread
+
+    Records go through a bounded queue and are written in batches to
+    <directory>/audit.jsonl, which is rotated and gzipped once it exceeds
+    max_bytes or max_age seconds. When the writer falls behind, log() blocks
+    (back-pressure) and raises AuditLogFullError after put_timeout seconds
+    rather than dropping the record.
+
+    A batch that fails to write stays with the writer and is retried with
+    backoff on a reopened file, after truncating any partial write, so I/O
+    errors are logged and delay records instead of losing them. close()
+    waits at most close_timeout seconds for the queue to drain.
+    """
+    def __init__(self, directory, max_queue: int = 10000, batch_size: int = 500,
+                 flush_interval: float = 1.0, max_bytes: int = 50 * 1024**2,
+                 max_age: float = 24 * 3600, put_timeout: float = 5.0,
+                 retry_interval: float = 1.0, close_timeout: float = 30.0):
+        self.directory = Path(directory)
+        self.path = self.directory / "audit.jsonl"
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.put_timeout = put_timeout
+        self.retry_interval = retry_interval
+        self.close_timeout = close_timeout
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._abandon = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._file = None
+        self._opened_at = None
+
+    def start(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._thread.start()
+        return self
+
+    def log(self, record: Dict) -> str:
+        """Queue a record for writing and return its audit id"""
+        audit_id = uuid.uuid4().hex
+        entry = {'audit_id': audit_id, 'timestamp': datetime.now(timezone.utc).isoformat(), **record}
+        if not self._thread.is_alive():
+            raise AuditLogFullError("Audit writer is not running")
+        try:
+            self._queue.put(entry, timeout=self.put_timeout)
+        except queue.Full:
+            raise AuditLogFullError(f"Audit queue full for {self.put_timeout}s") from None
+        return audit_id
+
+    def close(self) -> None:
+        """Flush everything queued so far and stop the writer, waiting at most close_timeout"""
+        if not self._thread.is_alive():
+            return
+        deadline = time.monotonic() + self.close_timeout
+        try:
+            self._queue.put(_STOP, timeout=self.close_timeout)
+        except queue.Full:
+            pass
+        self._thread.join(max(0.0, deadline - time.monotonic()))
+        if self._thread.is_alive():
+            # Writer is stuck retrying; tell it to give up so shutdown is not blocked
+            self._abandon.set()
+            self._thread.join(self.flush_interval + 1.0)
+
+    def _open(self):
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._opened_at = time.time()
+
+    def _rotate(self):
+        self._file.close()
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')
+        rotated = self.directory / f"audit-{stamp}.jsonl"
+        os.replace(self.path, rotated)
+        with open(rotated, 'rb') as src, gzip.open(f"{rotated}.gz", 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        rotated.unlink()
+        self._open()
+
+    def _should_rotate(self):
+        return (self._file.tell() >= self.max_bytes
+                or time.time() - self._opened_at >= self.max_age)
+
+    def _write(self, batch):
+        self._file.write(''.join(json.dumps(entry, default=_json_default) + '\n' for entry in batch))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _discard_file(self, size=None):
+        """Drop the live file handle after an error, truncating a partial batch back to size"""
+        if self._file is None:
+            return
+        try:
+            self._file.close()
+        except (OSError, ValueError):
+            pass
+        self._file = None
+        if size is not None:
+            try:
+                if os.path.getsize(self.path) > size:
+                    os.truncate(self.path, size)
+            except OSError as e:
+                logger.error("Could not truncate partial audit batch: %s", e)
+
+    def _maybe_rotate(self):
+        try:
+            if self._file is not None and self._file.tell() > 0 and self._should_rotate():
+                self._rotate()
+        except (OSError, ValueError) as e:
+            # Records already on disk stay in audit.jsonl or the uncompressed rotated file
+            logger.error("Audit log rotation failed: %s", e)
+            self._discard_file()
+
+    def _write_batch(self, batch) -> bool:
+        """Write a batch, retrying until it is on disk; False if the writer was told to give up"""
+        delay = self.retry_interval
+        while True:
+            size = None
+            try:
+                if self._file is None:
+                    self._open()
+                size = self._file.tell()
+                self._write(batch)
+                break
+            except (OSError, ValueError) as e:
+                logger.error("Audit write of %d records failed, retrying in %.1fs: %s",
+                             len(batch), delay, e)
+                self._discard_file(size)
+                if self._abandon.wait(delay):
+                    logger.error("Audit writer stopped with %d records unwritten",
+                                 len(batch) + self._queue.qsize())
+                    return False
+                delay = min(delay * 2, MAX_RETRY_INTERVAL)
+        self._maybe_rotate()
+        return True
+
+    def _run(self):
+        stopping = False
+        while not stopping and not self._abandon.is_set():
+            batch = []
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._maybe_rotate()
+                continue
+            while True:
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch and not self._write_batch(batch):
+                break
+        self._discard_file()
+
+
+if __name__ == '__main__':
+    # Benchmark: handler-side latency of queued vs synchronous audit writes
+    import statistics
+    import tempfile
+
+    n_requests = 20000
+    record = {'endpoint': '/predict',
+              'request': {f'BILL_AMT{i}': 1000.0 * i for i in range(1, 7)},
+              'response': {'default_probability': 0.2345, 'default_prediction': 0,
+                           'default_label': 'No Default', 'risk_level': 'Medium'}}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sync_path = Path(tmp) / "sync.jsonl"
+        sync_latencies = []
+        with open(sync_path, 'a') as f:
+            for _ in range(n_requests):
+                start = time.perf_counter()
+                f.write(json.dumps(record) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+                sync_latencies.append(time.perf_counter() - start)
+
+        audit_logger = AuditLogger(Path(tmp) / "audit").start()
+        async_latencies = []
+        for _ in range(n_requests):
+            start = time.perf_counter()
+            audit_logger.log(record)
+            async_latencies.append(time.perf_counter() - start)
+        audit_logger.close()
+
+    print("=" * 60)
+    print(f"Audit log latency per request ({n_requests} requests)")
+    print("=" * 60)
+    for name, latencies in [('synchronous write', sync_latencies), ('AuditLogger.log', async_latencies)]:
+        percentiles = statistics.quantiles([t * 1e6 for t in latencies], n=100)
+        print(f"{name:<20} p50: {percentiles[49]:8.1f} us   p99: {percentiles[98]:8.1f} us")
+
+    # End to end: POST /predict through the app with the audit logger and with a no-op stand-in.
+    # Needs a trained model in artifacts/ (python src/pipelines/run_pipeline.py)
+    import sys
+    sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+    from fastapi.testclient import TestClient
+    import Api.main as api
+
+    class NullAuditLogger:
+        def log(self, record):
+            return None
+
+    customer = {'ID': 1, 'LIMIT_BAL': 20000.0, 'AGE': 24, 'EDUCATION': 2, 'MARRIAGE': 1, 'SEX': 2,
+                'AGE_GROUP': 1,
+                **{f'BILL_AMT{i}': 1000.0 * i for i in range(1, 7)},
+                **{f'PAY_AMT{i}': 100.0 * i for i in range(1, 7)},
+                **{f'PAY_{i}': 0 for i in range(1, 7)}}
+    n_rounds, per_round = 10, 500
+    endpoint_latencies = {'no audit log': [], 'AuditLogger': []}
+    with TestClient(api.app) as client, tempfile.TemporaryDirectory() as tmp:
+        if api.predictor is None:
+            raise SystemExit("No trained model in artifacts/; run the pipeline first")
+        audit_loggers = {'no audit log': NullAuditLogger(),
+                         'AuditLogger': AuditLogger(Path(tmp) / "audit").start()}
+        served_logger = api.audit_logger
+        for _ in range(100):
+            client.post("/predict", json=customer)
+        # Alternate rounds so drift in machine load affects both variants equally
+        for _ in range(n_rounds):
+            for name, audit_logger in audit_loggers.items():
+                api.audit_logger = audit_logger
+                for _ in range(per_round):
+                    start = time.perf_counter()
+                    response = client.post("/predict", json=customer)
+                    endpoint_latencies[name].append(time.perf_counter() - start)
+                    assert response.status_code == 200, response.text
+        api.audit_logger = served_logger
+        audit_loggers['AuditLogger'].close()
+
+    print("=" * 60)
+    print(f"POST /predict latency ({n_rounds * per_round} requests per variant)")
+    print("=" * 60)
+    for name, latencies in endpoint_latencies.items():
+        percentiles = statistics.quantiles([t * 1e3 for t in latencies], n=100)
+        print(f"{name:<20} p50: {percentiles[49]:8.2f} ms   p99: {percentiles[98]:8.2f} ms")
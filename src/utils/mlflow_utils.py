@@ -0,0 +1,97 @@
+"""
+MLflow Utilities
+Batched, background-thread metric logging for training runs
+"""
+import queue
+import threading
+import time
+from typing import Dict, List, Optional
+
+RESOURCE_FIELDS = ('wall_s', 'cpu_s', 'peak_rss_mb')
+MAX_METRICS_PER_BATCH = 1000  # MLflow's log_batch limit
+
+_STOP = object()
+
+
+def resource_metric_key(name: str, field: str) -> str:
+    return f"resources.{name}.{field}"
+
+
+class MlflowBatchLogger:
+    """
+    Writes metrics to an MLflow run from a background thread
+
+    log_metrics() and log_record() only enqueue; the writer collects metrics
+    for up to flush_interval seconds after the first one arrives and sends
+    them in MlflowClient.log_batch calls of at most batch_size metrics. A
+    failed write is reported and dropped rather than raised into training.
+    """
+    def __init__(self, run_id: str, tracking_uri: Optional[str] = None,
+                 batch_size: int = MAX_METRICS_PER_BATCH, flush_interval: float = 1.0):
+        self.run_id = run_id
+        self.tracking_uri = tracking_uri
+        self.batch_size = min(batch_size, MAX_METRICS_PER_BATCH)
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="mlflow-writer", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def log_metrics(self, metrics: Dict[str, float], step: int = 0) -> None:
+        timestamp = int(time.time() * 1000)
+        for key, value in metrics.items():
+            self._queue.put((key, float(value), timestamp, step))
+
+    def log_record(self, record: Dict) -> None:
+        """Queue one ResourceTracker record as resources.<name>.<field> metrics"""
+        step = record['step'] if record['step'] is not None else 0
+        for field in RESOURCE_FIELDS:
+            if field in record:
+                self._queue.put((resource_metric_key(record['name'], field), float(record[field]),
+                                 record['timestamp'], step))
+
+    def log_records(self, records: List[Dict]) -> None:
+        for record in records:
+            self.log_record(record)
+
+    def close(self) -> None:
+        """Flush everything queued so far and stop the writer"""
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _write(self, client, batch):
+        from mlflow.entities import Metric
+
+        for start in range(0, len(batch), self.batch_size):
+            metrics = [Metric(key, value, timestamp, step)
+                       for key, value, timestamp, step in batch[start:start + self.batch_size]]
+            try:
+                client.log_batch(self.run_id, metrics=metrics)
+            except Exception as e:
+                print(f"Could not log {len(metrics)} metrics to MLflow: {e}")
+
+    def _run(self):
+        from mlflow.tracking import MlflowClient
+
+        client = MlflowClient(self.tracking_uri)
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            # Collect for up to flush_interval after the first metric so a burst becomes one call
+            deadline = time.monotonic() + self.flush_interval
+            batch = []
+            while True:
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(client, batch)
@@ -0,0 +1,169 @@
+"""
+Drift Monitoring Utilities
+Fixed-size per-feature sketches of served traffic compared against a training reference
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import json
+import threading
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from utils.data_utils import FEATURE_ALIASES
+
+MONITORED_FEATURES = [
+    'LIMIT_BAL',
+    'PAY_0', 'PAY_2', 'PAY_3', 'PAY_4', 'PAY_5', 'PAY_6',
+    'BILL_AMT1', 'BILL_AMT2', 'BILL_AMT3', 'BILL_AMT4', 'BILL_AMT5', 'BILL_AMT6',
+]
+
+PSI_WARNING = 0.1
+PSI_ALERT = 0.2
+# PSI over ~10 bins is dominated by empty bins on small samples, so no status is assigned below this
+MIN_SAMPLES = 500
+
+
+def population_stability_index(expected: np.ndarray, actual: np.ndarray, eps: float = 1e-6) -> float:
+    """PSI between two binned distributions given as counts over the same bins"""
+    expected = np.asarray(expected, dtype=float)
+    actual = np.asarray(actual, dtype=float)
+    expected = np.clip(expected / max(expected.sum(), 1), eps, None)
+    actual = np.clip(actual / max(actual.sum(), 1), eps, None)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def ks_statistic(expected: np.ndarray, actual: np.ndarray) -> float:
+    """Kolmogorov-Smirnov distance evaluated at the shared bin edges"""
+    expected = np.asarray(expected, dtype=float)
+    actual = np.asarray(actual, dtype=float)
+    expected_cdf = np.cumsum(expected) / max(expected.sum(), 1)
+    actual_cdf = np.cumsum(actual) / max(actual.sum(), 1)
+    return float(np.max(np.abs(expected_cdf - actual_cdf)))
+
+
+class FeatureSketch:
+    """Histogram over fixed bin edges plus running moments; memory does not grow with traffic"""
+    def __init__(self, edges):
+        self.edges = np.asarray(edges, dtype=float)
+        self.counts = np.zeros(len(self.edges) + 1, dtype=np.int64)
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return
+
+        bins = np.searchsorted(self.edges, values, side='right')
+        self.counts += np.bincount(bins, minlength=len(self.counts))
+
+        # Chan et al. merge of the batch moments into the running moments
+        batch_n = values.size
+        batch_mean = values.mean()
+        batch_m2 = ((values - batch_mean) ** 2).sum()
+        total = self.n + batch_n
+        delta = batch_mean - self.mean
+        self.mean += delta * batch_n / total
+        self.m2 += batch_m2 + delta ** 2 * self.n * batch_n / total
+        self.n = total
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self.m2 / (self.n - 1))) if self.n > 1 else 0.0
+
+
+class DriftMonitor:
+    """Tracks served feature distributions and scores them against the training reference"""
+    def __init__(self, reference: Dict[str, Dict], min_samples: int = MIN_SAMPLES):
+        """
+        Args:
+            reference: Per-feature dict with 'edges', 'counts', 'mean' and 'std'
+                       as produced by from_training_data
+            min_samples: Served rows a feature needs before it gets a stable/warning/drift status
+        """
+        self.reference = reference
+        self.min_samples = min_samples
+        self.sketches = {feature: FeatureSketch(ref['edges']) for feature, ref in reference.items()}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_training_data(cls, df: pd.DataFrame, features: List[str] = None, n_bins: int = 10):
+        """Build reference bins from training quantiles"""
+        features = [f for f in (features or MONITORED_FEATURES) if f in df.columns]
+        quantiles = np.linspace(0, 1, n_bins + 1)[1:-1]
+        reference = {}
+        for feature in features:
+            values = df[feature].to_numpy(dtype=float)
+            edges = np.unique(np.quantile(values, quantiles))
+            counts = np.bincount(np.searchsorted(edges, values, side='right'), minlength=len(edges) + 1)
+            reference[feature] = {
+                'edges': edges.tolist(),
+                'counts': counts.tolist(),
+                'mean': float(values.mean()),
+                'std': float(values.std(ddof=1)),
+            }
+        return cls(reference)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def save(self, path) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.reference, f, indent=2)
+
+    def update(self, df: pd.DataFrame) -> None:
+        """Fold a batch of served rows into the sketches"""
+        aliases = {alias: feature for alias, feature in FEATURE_ALIASES.items()
+                   if alias in df.columns and feature not in df.columns}
+        if aliases:
+            df = df.rename(columns=aliases)
+        columns = [feature for feature in self.sketches if feature in df.columns]
+        values = df[columns].to_numpy(dtype=float)
+        with self._lock:
+            for i, feature in enumerate(columns):
+                self.sketches[feature].update(values[:, i])
+
+    def report(self) -> Dict[str, Dict]:
+        """PSI/KS and moments per feature against the reference snapshot"""
+        results = {}
+        with self._lock:
+            for feature, sketch in self.sketches.items():
+                ref = self.reference[feature]
+                if sketch.n == 0:
+                    results[feature] = {'n': 0, 'status': 'no_data'}
+                    continue
+                psi = population_stability_index(ref['counts'], sketch.counts)
+                if sketch.n < self.min_samples:
+                    status = 'insufficient_data'
+                elif psi >= PSI_ALERT:
+                    status = 'drift'
+                elif psi >= PSI_WARNING:
+                    status = 'warning'
+                else:
+                    status = 'stable'
+                results[feature] = {
+                    'n': int(sketch.n),
+                    'psi': round(psi, 4),
+                    'ks': round(ks_statistic(ref['counts'], sketch.counts), 4),
+                    'mean': float(sketch.mean),
+                    'std': sketch.std,
+                    'min': float(sketch.min),
+                    'max': float(sketch.max),
+                    'reference_mean': ref['mean'],
+                    'reference_std': ref['std'],
+                    'status': status,
+                }
+        return results
@@ -0,0 +1,152 @@
+"""
+Profiling Utilities
+Opt-in cProfile/tracemalloc capture for training stages and serving
+
+Set CREDIT_SCORING_PROFILE=1 to profile every function decorated with @profiled,
+or wrap a block in profile_run(). Each run writes to artifacts/profiles/<name>-<timestamp>/:
+    profile.pstats       raw cProfile stats (snakeviz, pstats)
+    top_functions.txt    functions sorted by cumulative time
+    stacks.folded        sampled collapsed stacks for flamegraph.pl / speedscope
+    top_allocations.txt  tracemalloc top allocating lines and peak traced memory
+
+Only the calling thread is profiled; work done in joblib/loky worker processes
+shows up as time spent waiting on them. tracemalloc is process-wide, so profiled
+runs are serialized (parallel pipeline stages wait for each other while profiling
+is on); allocations by unprofiled threads running at the same time still appear.
+
+The API honours the X-Profile request header only when CREDIT_SCORING_PROFILE_HEADER=1.
+"""
+import cProfile
+import functools
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+PROFILE_ENV_VAR = 'CREDIT_SCORING_PROFILE'
+PROFILE_HEADER_ENV_VAR = 'CREDIT_SCORING_PROFILE_HEADER'
+PROFILE_DIR = Path(__file__).parent.parent.parent / "artifacts" / "profiles"
+
+logger = logging.getLogger(__name__)
+
+# One profiled run at a time, so tracemalloc results are not mixed across runs
+_run_lock = threading.Lock()
+
+
+def _env_flag(name) -> bool:
+    return os.environ.get(name, '').lower() in ('1', 'true', 'yes')
+
+
+def profiling_enabled() -> bool:
+    return _env_flag(PROFILE_ENV_VAR)
+
+
+def profile_header_allowed() -> bool:
+    """Whether API clients may turn on profiling with the X-Profile header"""
+    return _env_flag(PROFILE_HEADER_ENV_VAR)
+
+
+class StackSampler:
+    """Periodically samples the stack of one thread into collapsed-stack counts"""
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{Path(code.co_filename).name}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+def _write_reports(run_dir, profiler, sampler, snapshot, peak):
+    run_dir.mkdir(parents=True, exist_ok=True)
+    profiler.dump_stats(str(run_dir / "profile.pstats"))
+
+    buffer = io.StringIO()
+    pstats.Stats(profiler, stream=buffer).sort_stats('cumulative').print_stats(40)
+    (run_dir / "top_functions.txt").write_text(buffer.getvalue())
+
+    with open(run_dir / "stacks.folded", 'w') as f:
+        for stack, count in sampler.stacks.most_common():
+            f.write(f"{stack} {count}\n")
+
+    snapshot = snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+    lines = ["tracemalloc is process-wide: allocations by other threads during this run are included",
+             f"Peak traced memory: {peak / (1024**2):.2f} MB", ""]
+    lines += [str(stat) for stat in snapshot.statistics('lineno')[:25]]
+    (run_dir / "top_allocations.txt").write_text('\n'.join(lines) + '\n')
+
+
+@contextmanager
+def profile_run(name, output_dir=None):
+    """Profile the enclosed block; nested blocks are folded into the outer profile"""
+    if sys.getprofile() is not None:
+        yield
+        return
+
+    with _run_lock:
+        profiler = cProfile.Profile()
+        sampler = StackSampler(threading.get_ident())
+        started_tracemalloc = not tracemalloc.is_tracing()
+        if started_tracemalloc:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        sampler.start()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            sampler.stop()
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            if started_tracemalloc:
+                tracemalloc.stop()
+            stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+            run_dir = Path(output_dir or PROFILE_DIR) / f"{name}-{stamp}"
+            _write_reports(run_dir, profiler, sampler, snapshot, peak)
+            logger.info(f"Profile for {name} written to {run_dir}")
+
+
+def profiled(name=None):
+    """
+    Decorator profiling each call when CREDIT_SCORING_PROFILE is set at import time.
+    When it is not set the function is returned unchanged, so there is no overhead.
+
+    Args:
+        name: Run name, or a callable building it from the call arguments
+    """
+    def decorator(func):
+        if not profiling_enabled():
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            run_name = name(*args, **kwargs) if callable(name) else (name or func.__qualname__)
+            with profile_run(run_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
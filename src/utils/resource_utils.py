@@ -0,0 +1,139 @@
+"""
+Resource Utilities
+Wall time, CPU time and peak RSS accounting for pipeline stages and training steps
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import psutil
+
+MB = 1024**2
+
+
+def reset_peak_rss() -> bool:
+    """
+    Reset this process's RSS high-water mark so peak_rss_since_reset() covers only what follows
+
+    Uses /proc/self/clear_refs (Linux); returns False where the mark cannot be reset.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_since_reset() -> int:
+    """VmHWM of this process in bytes, i.e. peak RSS since the last reset_peak_rss()"""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) * 1024
+    raise OSError("VmHWM not reported in /proc/self/status")
+
+
+class ResourceMonitor:
+    """Samples RSS of this process and its workers, tracking the peak seen by each running stage"""
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.process = psutil.Process()
+        self._peaks = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _rss(self):
+        rss = self.process.memory_info().rss
+        for child in self.process.children(recursive=True):
+            try:
+                rss += child.memory_info().rss
+            except psutil.Error:
+                pass
+        return rss
+
+    def _sample(self):
+        rss = self._rss()
+        with self._lock:
+            for name in self._peaks:
+                self._peaks[name] = max(self._peaks[name], rss)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def begin(self, name):
+        with self._lock:
+            self._peaks[name] = 0
+        self._sample()
+
+    def end(self, name):
+        self._sample()
+        with self._lock:
+            return self._peaks.pop(name)
+
+
+class ResourceTracker:
+    """
+    Records wall time, CPU time and peak RSS of named training steps
+
+    CPU time and RSS include live worker processes (loky CV/stacking workers),
+    so steps running concurrently in other threads are counted in both. Each
+    record is appended to `records` and forwarded to `sink` (e.g. an
+    MlflowBatchLogger), which must not block.
+    """
+    def __init__(self, records: Optional[List[Dict]] = None, sink=None, interval: float = 0.05):
+        self.records = records if records is not None else []
+        self.sink = sink
+        self.process = psutil.Process()
+        self.monitor = ResourceMonitor(interval)
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self.monitor.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.monitor.stop()
+
+    def _cpu_seconds(self):
+        times = self.process.cpu_times()
+        total = times.user + times.system
+        for child in self.process.children(recursive=True):
+            try:
+                child_times = child.cpu_times()
+            except psutil.Error:
+                continue
+            total += child_times.user + child_times.system
+        return total
+
+    @contextmanager
+    def track(self, name: str, step: Optional[int] = None):
+        key = name if step is None else f"{name}#{step}"
+        self.monitor.begin(key)
+        cpu_start = self._cpu_seconds()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start
+            self.add(name, step, wall_s=wall, cpu_s=self._cpu_seconds() - cpu_start,
+                     peak_rss_mb=self.monitor.end(key) / MB)
+
+    def add(self, name: str, step: Optional[int] = None, **values: float) -> None:
+        """Record a measurement taken elsewhere, e.g. inside a worker process"""
+        record = {'name': name, 'step': step, 'timestamp': int(time.time() * 1000), **values}
+        with self._lock:
+            self.records.append(record)
+        if self.sink is not None:
+            self.sink.log_record(record)
@@ -0,0 +1,217 @@
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import gzip
+import json
+import time
+from contextlib import nullcontext
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+import Api.main as api
+from Api.main import _profiling
+from data_procession.processing import DataProcessor
+from models.score_table import ScoreTable
+from utils import audit_utils
+from utils.audit_utils import AuditLogger, AuditLogFullError
+from utils.data_utils import FEATURE_COLUMNS, FLOAT_COLUMNS
+from utils.monitoring_utils import DriftMonitor
+from utils.profiling_utils import PROFILE_HEADER_ENV_VAR
+
+
+# Audit log
+
+def read_audit_records(directory):
+    lines = []
+    for path in sorted(Path(directory).glob("audit-*.jsonl.gz")):
+        with gzip.open(path, 'rt') as f:
+            lines += f.read().splitlines()
+    live = Path(directory) / "audit.jsonl"
+    if live.exists():
+        lines += live.read_text().splitlines()
+    return [json.loads(line) for line in lines]
+
+
+def test_audit_records_survive_write_errors(tmp_path, monkeypatch):
+    real_fsync = audit_utils.os.fsync
+    failures = {'left': 2}
+
+    def flaky_fsync(fd):
+        if failures['left']:
+            failures['left'] -= 1
+            raise OSError(5, "Input/output error")
+        real_fsync(fd)
+
+    monkeypatch.setattr(audit_utils.os, 'fsync', flaky_fsync)
+    audit_logger = AuditLogger(tmp_path, retry_interval=0.01, flush_interval=0.05).start()
+    ids = [audit_logger.log({'endpoint': '/predict', 'n': i}) for i in range(20)]
+    audit_logger.close()
+
+    records = read_audit_records(tmp_path)
+    assert failures['left'] == 0
+    # Retried batches are truncated before rewriting, so each record appears exactly once
+    assert [record['audit_id'] for record in records] == ids
+
+
+def test_close_does_not_hang_when_writer_cannot_write(tmp_path, monkeypatch):
+    def broken_fsync(fd):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(audit_utils.os, 'fsync', broken_fsync)
+    audit_logger = AuditLogger(tmp_path, max_queue=5, put_timeout=0.05, retry_interval=0.01,
+                               flush_interval=0.05, close_timeout=0.5).start()
+    audit_logger.log({'n': 0})
+    time.sleep(0.1)
+    with pytest.raises(AuditLogFullError):
+        for i in range(10):
+            audit_logger.log({'n': i})
+
+    start = time.perf_counter()
+    audit_logger.close()
+    assert time.perf_counter() - start < 3
+    assert not audit_logger._thread.is_alive()
+    with pytest.raises(AuditLogFullError):
+        audit_logger.log({'n': -1})
+
+
+def test_audit_log_rotates_and_gzips(tmp_path):
+    audit_logger = AuditLogger(tmp_path, batch_size=10, max_bytes=500, flush_interval=0.05).start()
+    ids = [audit_logger.log({'endpoint': '/batch_predict', 'n': i}) for i in range(50)]
+    audit_logger.close()
+
+    assert list(tmp_path.glob("audit-*.jsonl.gz"))
+    assert not list(tmp_path.glob("audit-*.jsonl"))
+    assert sorted(record['audit_id'] for record in read_audit_records(tmp_path)) == sorted(ids)
+
+
+# Profiling header
+
+def test_profile_header_ignored_unless_allowed(monkeypatch):
+    monkeypatch.delenv(PROFILE_HEADER_ENV_VAR, raising=False)
+    assert isinstance(_profiling("api_predict", "1"), nullcontext)
+
+    monkeypatch.setenv(PROFILE_HEADER_ENV_VAR, "1")
+    assert not isinstance(_profiling("api_predict", "1"), nullcontext)
+    assert isinstance(_profiling("api_predict", None), nullcontext)
+
+
+# Endpoints, served by a stub model behind a real processor
+
+class LimitScorer:
+    """Stand-in model whose probability depends on the scaled LIMIT_BAL"""
+    def predict(self, X):
+        return 1 / (1 + np.exp(-np.asarray(X['LIMIT_BAL'], dtype=float)))
+
+
+def customer_book(n):
+    rng = np.random.default_rng(5)
+    book = pd.DataFrame({col: rng.uniform(0, 5e4, n) if col in FLOAT_COLUMNS else np.zeros(n, dtype=int)
+                         for col in FEATURE_COLUMNS})
+    return book.assign(ID=np.arange(1, n + 1), SEX=1, EDUCATION=2, MARRIAGE=1,
+                       AGE=rng.integers(21, 70, n), PAY_0=rng.integers(-2, 9, n))
+
+
+@pytest.fixture
+def book():
+    return customer_book(50)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch, book):
+    processor = DataProcessor(['LIMIT_BAL', 'BILL_AMT1', 'AGE'], scaler_type='standard')
+    processor.scale_data(book, book)
+    joblib.dump(LimitScorer(), tmp_path / "ensemble_model.pkl")
+    joblib.dump(processor, tmp_path / "processor.pkl")
+    predictor = api.CreditScorePredictor(artifacts_dir=tmp_path)
+
+    X_scaled = processor.transform(book)
+    ScoreTable.build(ids=book['ID'].to_numpy(), features=X_scaled.to_numpy(), scores=predictor.score(book),
+                     columns=list(X_scaled.columns), directory=tmp_path / "score_table",
+                     model_fingerprint=predictor.fingerprint)
+
+    audit_logger = AuditLogger(tmp_path / "audit", flush_interval=0.05).start()
+    monkeypatch.setattr(api, 'predictor', predictor)
+    monkeypatch.setattr(api, 'score_table', ScoreTable(tmp_path / "score_table"))
+    monkeypatch.setattr(api, 'drift_monitor', DriftMonitor(DriftMonitor.from_training_data(book).reference))
+    monkeypatch.setattr(api, 'audit_logger', audit_logger)
+    # Globals are patched directly, so the app's lifespan (which loads artifacts/) is not run
+    yield TestClient(api.app)
+    audit_logger.close()
+
+
+def test_score_by_id_serves_table_scores_for_loaded_model(client, book):
+    expected = round(float(LimitScorer().predict(api.predictor.processor.transform(book.iloc[[6]]))[0]), 4)
+    response = client.get("/score/7")
+    assert response.status_code == 200
+    assert response.json()['default_probability'] == expected
+    assert client.get("/score/7", params={'rescore': True}).json() == response.json()
+    assert client.get("/score/999").status_code == 404
+
+
+def test_score_table_from_another_model_is_refused(client, monkeypatch):
+    monkeypatch.setattr(api.predictor, 'fingerprint', 'retrained')
+    for params in ({}, {'rescore': True}):
+        response = client.get("/score/7", params=params)
+        assert response.status_code == 503
+        assert "out of date" in response.json()['detail']
+
+
+def batch_body(frame):
+    return json.dumps({col: frame[col].tolist() for col in FEATURE_COLUMNS})
+
+
+def test_fast_predict_returns_flat_orjson_object(client, book):
+    row = book.iloc[3]
+    response = client.post("/fast/predict", content=json.dumps({col: row[col].item() for col in FEATURE_COLUMNS}))
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/json'
+    body = response.json()
+    assert set(body) == {'ID', 'default_probability', 'default_prediction', 'default_label', 'risk_level'}
+    assert body['ID'] == 4
+
+    # Same score as the record-oriented /predict, which sends PAY_1 and AGE_GROUP
+    record = {col: row[col].item() for col in FEATURE_COLUMNS if col != 'PAY_0'}
+    record.update(PAY_1=int(row['PAY_0']), AGE_GROUP=1)
+    assert client.post("/predict", json=record).json() == body
+
+
+def test_fast_batch_predict_returns_one_array_per_field(client, book):
+    response = client.post("/fast/batch_predict", content=batch_body(book.iloc[:10]))
+    assert response.status_code == 200
+    body = response.json()
+    assert body['ID'] == list(range(1, 11))
+    assert all(len(values) == 10 for values in body.values())
+    np.testing.assert_allclose(body['default_probability'],
+                               np.round(api.predictor.score(book.iloc[:10]), 4))
+
+
+@pytest.mark.parametrize('body', [
+    'not json',
+    json.dumps({'ID': [1]}),
+    json.dumps({col: [] for col in FEATURE_COLUMNS}),
+])
+def test_fast_batch_predict_rejects_bad_batches_with_422(client, body):
+    response = client.post("/fast/batch_predict", content=body)
+    assert response.status_code == 422
+    assert 'sklearn' not in response.text and 'Transformer' not in response.text
+
+
+def test_fast_predict_reports_out_of_range_fields(client, book):
+    row = {col: book.iloc[0][col].item() for col in FEATURE_COLUMNS}
+    row.update(AGE=12)
+    response = client.post("/fast/predict", content=json.dumps(row))
+    assert response.status_code == 422
+    assert response.json()['detail'][0].startswith('AGE:')
+
+
+def test_drift_report_counts_served_rows(client, book):
+    before = client.get("/monitoring/drift").json()
+    assert before['LIMIT_BAL']['n'] == 0
+    client.post("/fast/batch_predict", content=batch_body(book.iloc[:10]))
+    assert client.get("/monitoring/drift").json()['LIMIT_BAL']['n'] == 10
@@ -0,0 +1,180 @@
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from pydantic import ValidationError
+from sklearn.preprocessing import PowerTransformer
+
+from data_procession.processing import DataProcessor, FastPowerTransformer
+from utils.data_utils import (
+    FEATURE_COLUMNS, FLOAT_COLUMNS, ColumnValidationError, columns_to_frame, decode_columns,
+    decode_row, validate_columns
+)
+from utils.monitoring_utils import (
+    DriftMonitor, FeatureSketch, ks_statistic, population_stability_index
+)
+
+
+# Drift monitoring
+
+def test_psi_and_ks_zero_for_identical_distributions():
+    counts = np.array([10, 20, 30, 40])
+    assert population_stability_index(counts, counts * 3) == pytest.approx(0.0)
+    assert ks_statistic(counts, counts * 3) == pytest.approx(0.0)
+
+
+def test_psi_and_ks_for_shifted_distribution():
+    expected = np.array([50, 50, 0, 0])
+    actual = np.array([0, 50, 50, 0])
+    assert ks_statistic(expected, actual) == pytest.approx(0.5)
+    assert population_stability_index(expected, actual) > 0.2
+
+
+def test_sketch_merges_batches_like_single_pass():
+    rng = np.random.default_rng(0)
+    values = rng.normal(3.0, 2.0, 1000)
+    edges = np.quantile(values, [0.25, 0.5, 0.75])
+
+    sketch = FeatureSketch(edges)
+    for batch in np.array_split(values, 7):
+        sketch.update(batch)
+
+    assert sketch.n == 1000
+    assert sketch.mean == pytest.approx(values.mean())
+    assert sketch.std == pytest.approx(values.std(ddof=1))
+    assert sketch.min == values.min() and sketch.max == values.max()
+    assert sketch.counts.tolist() == np.bincount(np.searchsorted(edges, values, side='right'),
+                                                 minlength=4).tolist()
+
+
+def test_sketch_ignores_nan():
+    sketch = FeatureSketch([0.0])
+    sketch.update(np.array([np.nan, 1.0]))
+    assert sketch.n == 1
+
+
+@pytest.fixture
+def training_frame():
+    rng = np.random.default_rng(1)
+    return pd.DataFrame({'LIMIT_BAL': rng.uniform(1e4, 5e5, 5000),
+                         'PAY_0': rng.integers(-2, 9, 5000)})
+
+
+def test_drift_report_needs_min_samples(training_frame):
+    monitor = DriftMonitor(DriftMonitor.from_training_data(training_frame).reference, min_samples=500)
+    monitor.update(training_frame.iloc[:14])
+    assert monitor.report()['LIMIT_BAL']['status'] == 'insufficient_data'
+
+    monitor.update(training_frame.iloc[14:2000])
+    assert monitor.report()['LIMIT_BAL']['status'] == 'stable'
+
+
+def test_drift_detected_on_shifted_traffic(training_frame):
+    monitor = DriftMonitor(DriftMonitor.from_training_data(training_frame).reference)
+    monitor.update(training_frame.assign(LIMIT_BAL=training_frame['LIMIT_BAL'] * 3))
+    assert monitor.report()['LIMIT_BAL']['status'] == 'drift'
+
+
+def test_pay_1_requests_feed_pay_0_sketch(training_frame):
+    monitor = DriftMonitor(DriftMonitor.from_training_data(training_frame).reference)
+    monitor.update(pd.DataFrame({'LIMIT_BAL': [1e5], 'PAY_1': [2]}))
+    assert monitor.report()['PAY_0']['n'] == 1
+
+
+# Request decoding and validation
+
+@pytest.fixture
+def customer():
+    row = {col: 1000.0 if col in FLOAT_COLUMNS else 0 for col in FEATURE_COLUMNS}
+    row.update({'ID': 1, 'SEX': 2, 'EDUCATION': 1, 'MARRIAGE': 1, 'AGE': 35})
+    return row
+
+
+def test_decode_row_and_columns_agree(customer):
+    row = decode_row(json.dumps(customer).encode())
+    batch = decode_columns(json.dumps({col: [value] * 3 for col, value in customer.items()}).encode())
+    assert row['AGE'].dtype == np.int64 and row['LIMIT_BAL'].dtype == np.float64
+    for col in FEATURE_COLUMNS:
+        np.testing.assert_array_equal(batch[col], np.repeat(row[col], 3))
+    validate_columns(batch)
+    assert list(columns_to_frame(batch).columns) == FEATURE_COLUMNS
+
+
+def test_decode_rejects_missing_and_mistyped_fields(customer):
+    with pytest.raises(ValidationError):
+        decode_row(json.dumps({k: v for k, v in customer.items() if k != 'AGE'}).encode())
+    with pytest.raises(ValidationError):
+        decode_row(json.dumps(customer | {'SEX': 'female'}).encode())
+
+
+def test_validate_columns_reports_every_bad_column(customer):
+    columns = decode_columns(json.dumps({col: [value] * 4 for col, value in customer.items()}).encode())
+    columns['AGE'][2] = 12
+    columns['PAY_0'][1] = 10
+    columns['BILL_AMT1'][3] = np.nan
+    with pytest.raises(ColumnValidationError) as excinfo:
+        validate_columns(columns)
+    messages = excinfo.value.errors
+    assert len(messages) == 3
+    assert any(m.startswith('AGE:') and 'first at row 2' in m for m in messages)
+    assert any(m.startswith('PAY_0:') and 'first at row 1' in m for m in messages)
+    assert any(m.startswith('BILL_AMT1: non-finite value at row 3') for m in messages)
+
+    columns = {'AGE': np.array([30, 40]), 'SEX': np.array([1])}
+    with pytest.raises(ColumnValidationError, match="different lengths"):
+        validate_columns(columns)
+
+    empty = decode_columns(json.dumps({col: [] for col in customer}).encode())
+    with pytest.raises(ColumnValidationError, match="no rows"):
+        validate_columns(empty)
+
+
+# FastPowerTransformer
+
+@pytest.fixture
+def skewed():
+    rng = np.random.default_rng(3)
+    return np.column_stack([rng.lognormal(10, 1, 20000), rng.exponential(2.0, 20000),
+                            -rng.gamma(2.0, 3.0, 20000), rng.normal(0, 1, 20000)])
+
+
+def test_fast_power_transformer_matches_sklearn_lambdas(skewed):
+    expected = PowerTransformer(method='yeo-johnson').fit(skewed)
+    fast = FastPowerTransformer(cache_path=None).fit(skewed)
+    np.testing.assert_allclose(fast.lambdas_, expected.lambdas_, atol=1e-3)
+    np.testing.assert_allclose(fast.transform(skewed[:100]), expected.transform(skewed[:100]), atol=1e-2)
+
+
+def test_lambda_cache_is_keyed_by_settings_and_bounded(tmp_path, skewed):
+    cache_path = tmp_path / "lambdas.json"
+    FastPowerTransformer(cache_path=cache_path).fit(skewed)
+    FastPowerTransformer(cache_path=cache_path, refine_window=0.1).fit(skewed)
+    cache = json.loads(cache_path.read_text())
+    assert len(cache) == 8
+    assert sum(key.endswith(':0.1') for key in cache) == 4
+
+    FastPowerTransformer(cache_path=cache_path, cache_size=6).fit(skewed[:, :2] * 2)
+    cache = json.loads(cache_path.read_text())
+    assert len(cache) == 6
+    assert sum(key.endswith(':0.1') for key in cache) == 4
+    assert [path.name for path in tmp_path.iterdir()] == ["lambdas.json"]
+
+
+# DataProcessor
+
+def test_outlier_clipping_uses_training_bounds(training_frame):
+    processor = DataProcessor(['LIMIT_BAL'], scaler_type='outlier_removal')
+    processor.scale_data(training_frame, training_frame)
+    lower, upper = processor.outlier_bounds['LIMIT_BAL']
+
+    batch = training_frame.iloc[:50].copy()
+    batch.iloc[0, batch.columns.get_loc('LIMIT_BAL')] = upper * 10
+    # A row scores the same alone as inside a batch, and is clipped to the training bound
+    pd.testing.assert_frame_equal(processor.transform(batch.iloc[:1]), processor.transform(batch).iloc[:1])
+    expected = processor.transform(training_frame.assign(LIMIT_BAL=upper).iloc[:1])
+    assert processor.transform(batch.iloc[:1])['LIMIT_BAL'].iloc[0] == expected['LIMIT_BAL'].iloc[0]
@@ -0,0 +1,185 @@
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import os
+import pickle
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_procession.processing import DataProcessor
+from models.model_registry import MODEL_REGISTRY, ModelSpec, build_models, get_model_spec
+from models.predict import CreditScorePredictor
+from models.score_table import ScoreTable
+from models.train import SharedTrainingData, StackedEnsembleTrainer, _fit_fold_proba
+from utils.resource_utils import reset_peak_rss
+
+
+class LimitScorer:
+    """Stand-in model whose probability depends on the scaled LIMIT_BAL"""
+    def predict(self, X):
+        return 1 / (1 + np.exp(-np.asarray(X['LIMIT_BAL'], dtype=float)))
+
+
+@pytest.fixture
+def raw_frame():
+    rng = np.random.default_rng(7)
+    return pd.DataFrame({'ID': rng.permutation(np.arange(100, 300)),
+                         'LIMIT_BAL': rng.uniform(1e4, 5e5, 200),
+                         'AGE': rng.integers(21, 70, 200),
+                         'PAY_0': rng.integers(-2, 9, 200),
+                         'BILL_AMT1': rng.normal(5e4, 2e4, 200)})
+
+
+@pytest.fixture
+def processor(raw_frame):
+    processor = DataProcessor(['LIMIT_BAL', 'AGE', 'BILL_AMT1'], scaler_type='standard')
+    processor.scale_data(raw_frame, raw_frame)
+    return processor
+
+
+# Score table
+
+def test_score_table_finds_ids_and_rescore_matches(tmp_path, raw_frame, processor):
+    model = LimitScorer()
+    X_scaled = processor.transform(raw_frame)
+    scores = model.predict(X_scaled)
+    ScoreTable.build(ids=raw_frame['ID'].to_numpy(), features=X_scaled.to_numpy(), scores=scores,
+                     columns=list(X_scaled.columns), directory=tmp_path)
+
+    table = ScoreTable(tmp_path)
+    assert len(table) == len(raw_frame)
+    assert table.find(99) is None
+    assert table.find(300) is None
+
+    row = raw_frame.index[raw_frame['ID'] == 123][0]
+    idx = table.find(123)
+    assert idx is not None
+    assert table.score(idx) == scores[row]
+    # Features are stored at full precision, so rescoring reproduces the stored score exactly
+    assert model.predict(table.features(idx))[0] == table.score(idx)
+
+
+# Predictor
+
+def test_predictor_scales_raw_features_with_saved_processor(tmp_path, raw_frame, processor):
+    joblib.dump(LimitScorer(), tmp_path / "ensemble_model.pkl")
+    joblib.dump(processor, tmp_path / "processor.pkl")
+    predictor = CreditScorePredictor(artifacts_dir=tmp_path)
+
+    batch = raw_frame.iloc[:5]
+    expected = LimitScorer().predict(processor.transform(batch))
+    results = predictor.predict_batch(batch)
+    np.testing.assert_allclose(results['default_probability'], np.round(expected, 4))
+
+
+def test_predictor_accepts_customer_data_field_names(tmp_path, raw_frame, processor):
+    joblib.dump(LimitScorer(), tmp_path / "ensemble_model.pkl")
+    joblib.dump(processor, tmp_path / "processor.pkl")
+    predictor = CreditScorePredictor(artifacts_dir=tmp_path)
+
+    batch = raw_frame.iloc[:5]
+    # /predict's CustomerData sends PAY_1 and an extra AGE_GROUP field
+    request = batch.rename(columns={'PAY_0': 'PAY_1'}).assign(AGE_GROUP=1)
+    np.testing.assert_array_equal(predictor.score(request), predictor.score(batch))
+
+
+def test_fast_path_scores_like_predict(tmp_path, raw_frame, processor):
+    joblib.dump(LimitScorer(), tmp_path / "ensemble_model.pkl")
+    joblib.dump(processor, tmp_path / "processor.pkl")
+    predictor = CreditScorePredictor(artifacts_dir=tmp_path)
+
+    batch = raw_frame.iloc[:5]
+    arrays = predictor.predict_arrays(batch)
+    records = predictor.predict(batch)
+    assert arrays['default_probability'].tolist() == [r['default_probability'] for r in records]
+    assert arrays['risk_level'] == [r['risk_level'] for r in records]
+
+
+def test_predictor_requires_processor(tmp_path):
+    joblib.dump(LimitScorer(), tmp_path / "ensemble_model.pkl")
+    with pytest.raises(FileNotFoundError):
+        CreditScorePredictor(artifacts_dir=tmp_path)
+
+
+# Shared training data
+
+def test_shared_training_data_is_dumped_once_and_pickles_as_handle(tmp_path, raw_frame):
+    y = (raw_frame['AGE'] > 45).astype(int)
+    shared = SharedTrainingData(raw_frame, y, n_splits=3, directory=tmp_path / "shared")
+    assert shared.X.dtype == np.float32 and shared.X.flags['C_CONTIGUOUS']
+    assert isinstance(shared.X, np.memmap)
+    np.testing.assert_allclose(shared.X, raw_frame.to_numpy(dtype=np.float32))
+    assert len(shared.folds) == 3
+
+    mtime = os.path.getmtime(shared.path)
+    reused = SharedTrainingData(raw_frame, y, n_splits=3, directory=tmp_path / "shared")
+    assert os.path.getmtime(reused.path) == mtime
+
+    restored = pickle.loads(pickle.dumps(shared))
+    assert isinstance(restored.X, np.memmap)
+    np.testing.assert_array_equal(restored.X, shared.X)
+    assert shared.__getstate__()['X'] is None
+
+    shared.close()
+    assert os.path.exists(shared.path)
+
+
+def test_temporary_shared_training_data_removed_on_close(raw_frame):
+    y = (raw_frame['AGE'] > 45).astype(int)
+    with SharedTrainingData(raw_frame, y, n_splits=3) as shared:
+        path = shared.path
+        assert os.path.exists(path)
+    assert not os.path.exists(path)
+
+
+class AllocatingModel:
+    """Classifier stub that touches `mb` megabytes while fitting"""
+    def __init__(self, mb):
+        self.mb = mb
+
+    def fit(self, X, y):
+        block = np.ones(self.mb * 1024**2 // 8)
+        self.total_ = float(block.sum())
+        return self
+
+    def predict_proba(self, X):
+        return np.full((len(X), 2), 0.5)
+
+
+@pytest.mark.skipif(not reset_peak_rss(), reason="RSS high-water mark cannot be reset here")
+def test_fold_peak_rss_covers_only_that_fold():
+    X, y = np.zeros((20, 2)), np.zeros(20)
+    idx = np.arange(20)
+    _, big = _fit_fold_proba(AllocatingModel(300), X, y, idx, idx)
+    _, small = _fit_fold_proba(AllocatingModel(1), X, y, idx, idx)
+    # A reused worker would otherwise report the earlier fold's high-water mark again
+    assert big['peak_rss_mb'] - small['peak_rss_mb'] > 200
+
+
+# Model registry
+
+def test_registry_entries_sharing_an_estimator_class_are_tuned_by_name(monkeypatch, raw_frame):
+    base = MODEL_REGISTRY['hist_gradient_boosting']
+    monkeypatch.setitem(MODEL_REGISTRY, 'hgb_shallow', ModelSpec(
+        'hgb_shallow', base.estimator, lambda trial: {'max_depth': trial.suggest_int('max_depth', 2, 3)},
+        params={'max_iter': 20}))
+    monkeypatch.setitem(MODEL_REGISTRY, 'hgb_deep', ModelSpec(
+        'hgb_deep', base.estimator, lambda trial: {'max_depth': trial.suggest_int('max_depth', 8, 9)},
+        params={'max_iter': 20}))
+
+    (name, model), = build_models(['hgb_deep'])
+    assert name == 'hgb_deep'
+    with pytest.raises(ValueError):
+        get_model_spec(model)
+
+    X = raw_frame[['LIMIT_BAL', 'AGE', 'BILL_AMT1']]
+    y = (raw_frame['AGE'] > 45).astype(int)
+    trainer = StackedEnsembleTrainer(build_models(['hgb_shallow', 'hgb_deep']), None, n_splits=3, n_trials=2)
+    with SharedTrainingData(X, y, n_splits=3) as shared:
+        depths = [trainer.tune_base_model(model, X, y, shared, name=name)[1]['max_depth']
+                  for name, model in zip(trainer.model_names, trainer.base_models)]
+    assert depths[0] in (2, 3) and depths[1] in (8, 9)
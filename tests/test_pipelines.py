@@ -0,0 +1,150 @@
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import importlib
+import threading
+import time
+
+import pytest
+
+from pipelines.run_pipeline import (
+    Pipeline, Stage, MODEL_KEY_TAG, _measured_records, _registered_run, _tag_records
+)
+from utils.profiling_utils import profile_run
+
+CALLS = []
+
+
+def source_stage(value):
+    CALLS.append('source')
+    return value
+
+
+def double_stage(x):
+    CALLS.append('double')
+    return 2 * x
+
+
+def measure_stage(x, run_id):
+    CALLS.append('measure')
+    return _tag_records([{'name': 'tune.a', 'wall_s': float(x)}], run_id)
+
+
+def combine_stage(measured, x, run_id):
+    CALLS.append('combine')
+    return _tag_records(list(measured) + [{'name': 'stack', 'wall_s': float(x)}], run_id)
+
+
+def build(value, modules=()):
+    return [Stage('source', source_stage, config={'value': value}),
+            Stage('double', double_stage, deps=['source'], modules=modules)]
+
+
+@pytest.fixture(autouse=True)
+def clear_calls():
+    CALLS.clear()
+
+
+def test_rerun_serves_every_stage_from_cache(tmp_path):
+    outputs = Pipeline(build(3), cache_dir=tmp_path).run()
+    assert outputs['double'] == 6
+    assert CALLS == ['source', 'double']
+
+    CALLS.clear()
+    pipeline = Pipeline(build(3), cache_dir=tmp_path)
+    pipeline.run()
+    assert CALLS == []
+    assert [row['status'] for row in pipeline.report] == ['cached', 'cached']
+    assert pipeline._output('double') == 6
+
+
+def test_config_change_reruns_stage_and_downstream(tmp_path):
+    Pipeline(build(3), cache_dir=tmp_path).run()
+    CALLS.clear()
+    outputs = Pipeline(build(4), cache_dir=tmp_path).run()
+    assert CALLS == ['source', 'double']
+    assert outputs['double'] == 8
+
+
+def test_no_cache_recomputes(tmp_path):
+    Pipeline(build(3), cache_dir=tmp_path).run()
+    CALLS.clear()
+    Pipeline(build(3), cache_dir=tmp_path, use_cache=False).run()
+    assert CALLS == ['source', 'double']
+
+
+def test_called_module_change_invalidates_key(tmp_path, monkeypatch):
+    module_dir = tmp_path / "modules"
+    module_dir.mkdir()
+    (module_dir / "scaler_impl.py").write_text("SCALE = 2\n")
+    monkeypatch.syspath_prepend(str(module_dir))
+    module = importlib.import_module('scaler_impl')
+
+    cache_dir = tmp_path / "cache"
+    first = Pipeline(build(3, modules=[module]), cache_dir=cache_dir)
+    first.run()
+
+    (module_dir / "scaler_impl.py").write_text("SCALE = 3  # changed\n")
+    CALLS.clear()
+    second = Pipeline(build(3, modules=[module]), cache_dir=cache_dir)
+    second.run()
+    assert second.stage_key('source') == first.stage_key('source')
+    assert second.stage_key('double') != first.stage_key('double')
+    assert CALLS == ['double']
+
+
+def test_records_from_cached_stages_are_not_counted_as_measured(tmp_path):
+    def stages(value):
+        return [Stage('source', source_stage, config={'value': 3}),
+                Stage('measure', measure_stage, deps=['source'], pass_run_id=True),
+                Stage('combine', combine_stage, deps=['measure'], config={'x': value},
+                      pass_run_id=True)]
+
+    first = Pipeline(stages(1), cache_dir=tmp_path)
+    first.run()
+    assert [r['name'] for r in _measured_records(first.outputs['combine'], first.run_id)] == ['tune.a', 'stack']
+
+    # Only the downstream stage re-runs; the measure records it carries came from the first run
+    CALLS.clear()
+    second = Pipeline(stages(2), cache_dir=tmp_path)
+    second.run()
+    assert CALLS == ['combine']
+    assert second.stage_key('measure') == first.stage_key('measure')
+    records = second.outputs['combine']
+    assert [r['pipeline_run'] for r in records] == [first.run_id, second.run_id]
+    assert [r['name'] for r in _measured_records(records, second.run_id)] == ['stack']
+
+
+def test_registered_run_found_by_stack_key(tmp_path):
+    mlflow = pytest.importorskip('mlflow')
+    mlflow.set_tracking_uri("file:///" + str(tmp_path / "mlruns"))
+    mlflow.set_experiment('pipeline_test')
+    assert _registered_run('abc123', 'pipeline_test') is None
+
+    with mlflow.start_run() as run:
+        mlflow.set_tag(MODEL_KEY_TAG, 'abc123')
+    assert _registered_run('abc123', 'pipeline_test') == run.info.run_id
+    assert _registered_run('other', 'pipeline_test') is None
+
+
+def test_profiled_stages_in_parallel_threads_are_serialized(tmp_path):
+    events = []
+
+    def stage(tag):
+        with profile_run(tag, output_dir=tmp_path):
+            events.append(('start', tag))
+            time.sleep(0.05)
+            events.append(('end', tag))
+
+    threads = [threading.Thread(target=stage, args=(tag,)) for tag in ('tune_a', 'tune_b')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    first, second = events[0][1], events[2][1]
+    assert events == [('start', first), ('end', first), ('start', second), ('end', second)]
+    reports = sorted(tmp_path.glob("*/top_allocations.txt"))
+    assert len(reports) == 2
+    assert reports[0].read_text().startswith("tracemalloc is process-wide")